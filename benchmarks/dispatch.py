@@ -0,0 +1,184 @@
+"""Offline benchmark for the message dispatch path.
+
+Run with ``python benchmarks/dispatch.py [-n ITERATIONS] [-o results.json]`` from the repository root.
+No network connection is made; the bot never logs in and commands never send.
+Per-message peak allocation needs Python 3.9+ and is reported as null on older versions.
+"""
+import os
+import sys
+import json
+import time
+import typing
+import asyncio
+import argparse
+import platform
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dico
+import dico_command
+
+
+class StubBot(dico_command.Bot):
+    async def _Client__request_user(self):
+        pass
+
+
+def make_message(bot, content: str, message_id: int) -> dico.Message:
+    return dico.Message(bot, {"id": str(message_id), "channel_id": "10", "guild_id": "1",
+                              "author": {"id": "42", "username": "bench", "discriminator": "0001", "avatar": None, "bot": False},
+                              "content": content, "timestamp": "2021-01-01T00:00:00+00:00", "edited_timestamp": None,
+                              "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [],
+                              "attachments": [], "embeds": [], "pinned": False, "type": 0})
+
+
+def populate_members(bot, count: int):
+    for x in range(count):
+        dico.GuildMember.create(bot, {"user": {"id": str(10000 + x), "username": f"member{x}", "discriminator": "0001", "avatar": None},
+                                      "roles": [], "joined_at": "2021-01-01T00:00:00+00:00", "deaf": False, "mute": False}, guild_id=1)
+
+
+def setup_bot(loop) -> StubBot:
+    bot = StubBot("bench", "!", loop=loop)
+
+    @bot.command("ping")
+    async def ping(ctx):
+        pass
+
+    @bot.command("three")
+    async def three(ctx, a: int, b: float, c: str):
+        pass
+
+    @bot.command("ten")
+    async def ten(ctx, a: int, b: int, c: int, d: int, e: int, f: str, g: str, h: str, i: float, *, j: str):
+        pass
+
+    @bot.command("quote")
+    async def quote(ctx, a: str, b: str, *, rest: str):
+        pass
+
+    @bot.command("union")
+    async def union(ctx, a: typing.Union[int, float, str], b: typing.Optional[int] = None):
+        pass
+
+    @bot.command("config")
+    async def config(ctx):
+        pass
+
+    @config.subcommand("prefix")
+    async def config_prefix(ctx):
+        pass
+
+    @config_prefix.subcommand("set")
+    async def config_prefix_set(ctx, value: str):
+        pass
+
+    @bot.command("member")
+    async def member(ctx, target: dico.GuildMember):
+        pass
+
+    return bot
+
+
+SCENARIOS: typing.Dict[str, typing.List[str]] = {
+    "chatter": ["hello there, how is everyone doing today?", "lol", "https://example.com/some/link"],
+    "unknown_command": ["!nope", "!alsonope with args"],
+    "args_0": ["!ping"],
+    "args_3": ["!three 1 2.5 word"],
+    "args_10": ["!ten 1 2 3 4 5 f g h 9.5 the rest of the line"],
+    "quoted": ['!quote "first quoted arg" "second one" and then the rest'],
+    "union": ["!union 5", "!union 5.5 3", "!union text"],
+    "subcommand": ["!config prefix set ??"],
+    "member_cache": ["!member member42", "!member 10042"],
+}
+
+
+def percentile(values: typing.List[float], q: float) -> float:
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def measure(bot, messages: typing.List[dico.Message]) -> typing.List[float]:
+    timings = []
+    for x in messages:
+        start = time.perf_counter()
+        await bot.execute_handler(x)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def measure_allocations(bot, messages: typing.List[dico.Message]) -> typing.Tuple[typing.Optional[float], float]:
+    track_peak = hasattr(tracemalloc, "reset_peak")
+    tracemalloc.start()
+    try:
+        peak_total = 0
+        before = tracemalloc.take_snapshot()
+        for x in messages:
+            if not track_peak:
+                await bot.execute_handler(x)
+                continue
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            await bot.execute_handler(x)
+            peak_total += tracemalloc.get_traced_memory()[1] - current
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    retained = sum(x.count_diff for x in after.compare_to(before, "filename") if x.count_diff > 0)
+    return peak_total / len(messages) if track_peak else None, retained / len(messages)
+
+
+def run_scenario(loop, bot, name: str, iterations: int, warmup: int, alloc_iterations: int) -> dict:
+    contents = SCENARIOS[name]
+    messages = [make_message(bot, contents[x % len(contents)], x) for x in range(iterations + warmup)]
+    loop.run_until_complete(measure(bot, messages[:warmup]))
+    start = time.perf_counter()
+    timings = loop.run_until_complete(measure(bot, messages[warmup:]))
+    elapsed = time.perf_counter() - start
+    peak_bytes, retained_blocks = loop.run_until_complete(measure_allocations(bot, messages[:alloc_iterations]))
+    timings.sort()
+    return {"messages": iterations,
+            "msgs_per_sec": iterations / elapsed,
+            "p50_us": percentile(timings, 0.5) * 1e6,
+            "p99_us": percentile(timings, 0.99) * 1e6,
+            "peak_bytes_per_msg": peak_bytes,
+            "retained_blocks_per_msg": retained_blocks}
+
+
+def main(argv: typing.Optional[typing.List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark dico-command message dispatch.")
+    parser.add_argument("-n", "--iterations", type=int, default=20000)
+    parser.add_argument("-w", "--warmup", type=int, default=1000)
+    parser.add_argument("-a", "--alloc-iterations", type=int, default=1000)
+    parser.add_argument("-m", "--members", type=int, default=50000, help="members cached for the member_cache scenario")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS), help="run only the given scenario(s)")
+    parser.add_argument("-o", "--output", help="write JSON results to this path instead of stdout")
+    args = parser.parse_args(argv)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    bot = setup_bot(loop)
+    populate_members(bot, args.members)
+    errors = []
+    bot.on("command_error", lambda ctx, ex: errors.append(repr(ex)))
+    results = {"python": platform.python_version(),
+               "dico_command": getattr(dico_command, "__version__", None),
+               "members": args.members,
+               "scenarios": {}}
+    for name in args.scenario or SCENARIOS:
+        results["scenarios"][name] = run_scenario(loop, bot, name, args.iterations, args.warmup, args.alloc_iterations)
+        loop.run_until_complete(asyncio.sleep(0))
+        print(f"{name}: {results['scenarios'][name]['msgs_per_sec']:.0f} msgs/sec", file=sys.stderr)
+    loop.run_until_complete(bot.close())
+    if errors:
+        results["errors"] = sorted(set(errors))
+    dumped = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="UTF-8") as f:
+            f.write(dumped)
+    else:
+        print(dumped)
+
+
+if __name__ == "__main__":
+    main()
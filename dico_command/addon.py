@@ -38,13 +38,18 @@ on_ = on
 
 class Addon:
     name: str
+    __members: typing.Tuple[typing.Any, ...] = ()
 
     def __init_subclass__(cls, **kwargs):
         cls.name = kwargs.get("name", cls.__name__)
+        members = {}
+        for klass in reversed(cls.__mro__):
+            members.update(vars(klass))
+        cls.__members = tuple(v for k, v in sorted(members.items()))
 
     def __init__(self, bot: "Bot"):
         self.bot = bot
-        resp = [getattr(self, x) for x in dir(self)]
+        resp = self.__members
         self.commands: typing.List[Command] = [x for x in resp if isinstance(x, Command) and not x.is_subcommand]
         self.listeners: typing.List[Listener] = [x for x in resp if isinstance(x, Listener)]
         self.interactions: typing.List["InteractionCommand"] = [x for x in resp if InteractionCommand is not None and isinstance(x, InteractionCommand)]
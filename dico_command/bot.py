@@ -1,19 +1,36 @@
+import time
 import typing
 import asyncio
+import functools
 import inspect
 import logging
 import traceback
 import importlib
+import collections
+import concurrent.futures
 import dico
 from .command import Command
+from .cache import TTLCache
 from .context import Context
-from .converter import AVAILABLE_CONVERTERS, ConverterBase
+from .cooldowns import CooldownBackend, MemoryCooldownBackend
+from .converter import AVAILABLE_CONVERTERS, ConverterBase, ConverterChain, LiteralConverter, ListConverter
 from .exception import *
-from .utils import smart_split, is_coro
+from .index import ConverterIndexes
+from .metrics import MetricsExporter
+from .prefix import PrefixIndex
+from .suggest import SuggestionIndex
+from .utils import is_coro, EXECUTOR_TYPES
 
 if typing.TYPE_CHECKING:
     from .addon import Addon
 
+Literal = getattr(typing, "Literal", None)
+
+
+class ModuleLoadTime(typing.NamedTuple):
+    import_time: float
+    load_time: float
+
 
 class Bot(dico.Client):
     def __init__(self,
@@ -28,6 +45,26 @@ class Bot(dico.Client):
                  monoshard: bool = False,
                  shard_count: typing.Optional[int] = None,
                  shard_id: typing.Optional[int] = None,
+                 prefix_cache_ttl: typing.Optional[float] = 0,
+                 prefix_cache_size: int = 1000,
+                 converter_cache_ttl: typing.Optional[float] = 300,
+                 converter_cache_size: int = 1000,
+                 converter_negative_ttl: typing.Optional[float] = 30,
+                 cooldown_backend: typing.Optional[CooldownBackend] = None,
+                 executor_workers: typing.Optional[int] = None,
+                 owner_cache_ttl: typing.Optional[float] = 3600,
+                 mention_prefix: bool = False,
+                 allowed_guild_ids: typing.Optional[typing.Iterable[dico.Snowflake.TYPING]] = None,
+                 allowed_channel_ids: typing.Optional[typing.Iterable[dico.Snowflake.TYPING]] = None,
+                 metrics: typing.Optional[MetricsExporter] = None,
+                 command_timeout: typing.Optional[float] = None,
+                 shutdown_timeout: typing.Optional[float] = 10,
+                 conversion_concurrency: int = 4,
+                 command_provider: typing.Optional[typing.Callable[[int], typing.Union[typing.Awaitable[typing.Iterable[Command]], typing.Iterable[Command]]]] = None,
+                 guild_command_cache_ttl: typing.Optional[float] = None,
+                 guild_command_cache_size: int = 1000,
+                 suggestion_index: typing.Optional[SuggestionIndex] = None,
+                 lazy_retry_ttl: typing.Optional[float] = 60,
                  **cache_max_sizes: int):
         super().__init__(token,
                          intents=intents,
@@ -39,56 +76,288 @@ class Bot(dico.Client):
                          shard_count=shard_count,
                          shard_id=shard_id,
                          **cache_max_sizes)
+        self.converter_indexes: typing.Optional[ConverterIndexes] = ConverterIndexes() if self.has_cache else None
+        if self.converter_indexes:
+            self.converter_indexes.register(self)
+            self.converter_indexes.rebuild(self.cache)
+        self.converter_cache: TTLCache[typing.Hashable, typing.Any] = TTLCache(converter_cache_ttl, converter_cache_size)
+        self.converter_misses: TTLCache[typing.Hashable, bool] = TTLCache(converter_negative_ttl, converter_cache_size)
+        self.cooldown_backend: CooldownBackend = cooldown_backend or MemoryCooldownBackend()
+        self.executor_workers = executor_workers
+        self.__executors: typing.Dict[str, concurrent.futures.Executor] = {}
+        self.owner_cache_ttl = owner_cache_ttl
+        self.owner_ids: typing.Optional[typing.FrozenSet[int]] = None
+        self.__owners_expire_at: typing.Optional[float] = None
+        self.__owner_refresh: typing.Optional[asyncio.Future] = None
+        self.prefix_cache: TTLCache[int, typing.Tuple[typing.Tuple[str, ...], PrefixIndex]] = TTLCache(prefix_cache_ttl, prefix_cache_size)
+        self.__mention_prefixes: typing.Tuple[str, ...] = ()
         self.prefixes = [prefix] if not isinstance(prefix, list) else prefix
-        self.commands = {}
-        self.aliases = {}
+        self.allowed_guild_ids: typing.Optional[typing.FrozenSet[int]] = frozenset(map(int, allowed_guild_ids)) if allowed_guild_ids is not None else None
+        self.allowed_channel_ids: typing.Optional[typing.FrozenSet[int]] = frozenset(map(int, allowed_channel_ids)) if allowed_channel_ids is not None else None
+        self.metrics: typing.Optional[MetricsExporter] = metrics
+        self.command_timeout = command_timeout
+        self.shutdown_timeout = shutdown_timeout
+        self.conversion_concurrency = conversion_concurrency
+        self.__invocations: typing.Dict[object, typing.Tuple[asyncio.Task, Context]] = {}
+        self.__cancel_requests: typing.Dict[object, bool] = {}
+        self.__idle: typing.Optional[asyncio.Future] = None
+        self.__draining = False
+        self.message_stats: typing.Counter[str] = collections.Counter()
+        self.commands: typing.Dict[str, Command] = {}
+        self.command_provider = command_provider
+        self.suggestion_index = suggestion_index
+        self.guild_commands: TTLCache[int, typing.Dict[str, Command]] = TTLCache(guild_command_cache_ttl, guild_command_cache_size)
         self.logger = logging.Logger("dico_command")
-        self.on("MESSAGE_CREATE", self.execute_handler)
+        self.on("MESSAGE_CREATE", self.handle_message_create)
+        if mention_prefix:
+            self.on("READY", self.__update_mention_prefixes)
         self.addons: typing.List[Addon] = []
         self.addon_names: typing.List[str] = []
         self.modules: typing.List[str] = []
+        self.module_load_times: typing.Dict[str, ModuleLoadTime] = {}
+        self.__lazy_commands: typing.Dict[str, str] = {}
+        self.lazy_failures: TTLCache[str, bool] = TTLCache(lazy_retry_ttl)
+        self.__reloading = False
+
+    def dispatch(self, name: str, *args: typing.Any):
+        # GUILD_DELETE payloads have no name, so the parsed event is None and only the raw payload knows the guild.
+        if name == "RAW" and self.converter_indexes and args[0].get("t") == "GUILD_DELETE" and not args[0]["d"].get("unavailable"):
+            self.converter_indexes.remove_guild_id(args[0]["d"]["id"])
+        super().dispatch(name, *args)
+
+    def get_executor(self, executor: str = "thread") -> concurrent.futures.Executor:
+        if executor not in EXECUTOR_TYPES:
+            raise ValueError(f"invalid executor type: {executor}")
+        if executor not in self.__executors:
+            executor_cls = concurrent.futures.ThreadPoolExecutor if executor == "thread" else concurrent.futures.ProcessPoolExecutor
+            self.__executors[executor] = executor_cls(max_workers=self.executor_workers)
+        return self.__executors[executor]
+
+    async def run_in_executor(self, func: typing.Callable, *args: typing.Any, executor: str = "thread") -> typing.Any:
+        return await self.loop.run_in_executor(self.get_executor(executor), functools.partial(func, *args))
+
+    async def shutdown_executors(self):
+        executors = [*self.__executors.values()]
+        self.__executors.clear()
+        for x in executors:
+            await self.loop.run_in_executor(None, functools.partial(x.shutdown, wait=True))
+
+    def running_invocations(self) -> typing.List[Context]:
+        return [x[1] for x in self.__invocations.values()]
+
+    def __cancel_invocation(self, token: object, timed_out: bool = False):
+        if token in self.__invocations and token not in self.__cancel_requests:
+            self.__cancel_requests[token] = timed_out
+            self.__invocations[token][0].cancel()
+
+    def cancel_invocations(self, addon: typing.Optional["Addon"] = None) -> int:
+        tokens = [k for k, v in self.__invocations.items() if addon is None or v[1].command.addon is addon]
+        for x in tokens:
+            self.__cancel_invocation(x)
+        return len(tokens)
+
+    async def drain_invocations(self, timeout: typing.Optional[float] = None) -> bool:
+        if not self.__invocations:
+            return True
+        if self.__idle is None or self.__idle.done():
+            self.__idle = self.loop.create_future()
+        try:
+            await asyncio.wait_for(asyncio.shield(self.__idle), timeout)
+        except asyncio.TimeoutError:
+            self.cancel_invocations()
+            return False
+        return True
+
+    async def __supervise(self, context: Context, coro: typing.Awaitable):
+        # The invocation runs in the handler's own task; a dedicated task per command costs more than the dispatch itself.
+        # Nested invocations share that task, so each one is tracked by its own token.
+        task = asyncio.current_task()
+        token = object()
+        self.__invocations[token] = (task, context)
+        timeout = next((x.timeout for x in reversed(context.command.lineage) if x.timeout is not None), self.command_timeout)
+        handle = self.loop.call_later(timeout, self.__cancel_invocation, token, True) if timeout is not None else None
+        try:
+            return await coro
+        except asyncio.CancelledError:
+            timed_out = self.__cancel_requests.pop(token, None)
+            if timed_out is None:
+                raise
+            if hasattr(task, "uncancel"):
+                task.uncancel()
+            if any(self.__invocations[x][0] is task for x in self.__cancel_requests):
+                # An enclosing invocation was cancelled as well; let it handle the one CancelledError delivered.
+                raise
+            if timed_out:
+                raise CommandTimedOut(timeout=timeout)
+        finally:
+            if handle is not None:
+                handle.cancel()
+            self.__cancel_requests.pop(token, None)
+            self.__invocations.pop(token, None)
+            if not self.__invocations and self.__idle is not None and not self.__idle.done():
+                self.__idle.set_result(None)
+
+    async def close(self):
+        self.__draining = True
+        try:
+            await self.drain_invocations(self.shutdown_timeout)
+            await super().close()
+        finally:
+            await self.shutdown_executors()
+
+    async def __fetch_owners(self) -> typing.FrozenSet[int]:
+        self.application = await self.request_current_bot_application_information()
+        owner_ids = self.application.owner_ids or [self.application.owner.id]
+        self.owner_ids = frozenset(int(x) for x in owner_ids)
+        self.__owners_expire_at = time.monotonic() + self.owner_cache_ttl if self.owner_cache_ttl is not None else None
+        return self.owner_ids
 
-    async def get_owners(self) -> typing.List[dico.Snowflake]:
-        if not self.application:
-            await self.request_current_bot_application_information()
-        return self.application.owner_ids if self.application.owner_ids else [self.application.owner.id]
+    async def refresh_owners(self) -> typing.FrozenSet[int]:
+        if self.__owner_refresh is None or self.__owner_refresh.done():
+            self.__owner_refresh = asyncio.ensure_future(self.__fetch_owners())
+        return await asyncio.shield(self.__owner_refresh)
+
+    def __background_refresh_owners(self):
+        if self.__owner_refresh is not None and not self.__owner_refresh.done():
+            return
+        self.__owner_refresh = asyncio.ensure_future(self.__fetch_owners())
+        self.__owner_refresh.add_done_callback(self.__owner_refresh_done)
+
+    def __owner_refresh_done(self, future: asyncio.Future):
+        if not future.cancelled() and future.exception():
+            self.logger.warning(f"Failed refreshing owners: {future.exception()!r}")
+
+    async def get_owners(self) -> typing.FrozenSet[int]:
+        if self.owner_ids is None:
+            return await self.refresh_owners()
+        if self.__owners_expire_at is not None and self.__owners_expire_at <= time.monotonic():
+            self.__background_refresh_owners()
+        return self.owner_ids
 
     async def is_owner(self, ctx: Context):
-        return ctx.author.id in await self.get_owners()
+        return int(ctx.author.id) in await self.get_owners()
+
+    @property
+    def prefixes(self) -> typing.Tuple[typing.Union[str, typing.Callable], ...]:
+        return self.__prefixes
+
+    @prefixes.setter
+    def prefixes(self, value):
+        self.__prefixes = tuple(value)
+        self.__static_prefix_index = PrefixIndex((*(x for x in self.__prefixes if isinstance(x, str)), *self.__mention_prefixes))
+        self.__dynamic_prefixes = tuple(x for x in self.__prefixes if not isinstance(x, str))
+        self.prefix_cache.clear()
+
+    def __update_mention_prefixes(self, ready: dico.Ready):
+        self.__mention_prefixes = (f"<@{ready.user.id}>", f"<@!{ready.user.id}>")
+        self.prefixes = self.__prefixes
+
+    async def resolve_dynamic_prefixes(self, message: dico.Message) -> typing.Tuple[str, ...]:
+        resolved = []
+        for x in self.__dynamic_prefixes:
+            resp = (await x(message)) if is_coro(x) else x(message)
+            if isinstance(resp, str):
+                resolved.append(resp)
+            elif resp:
+                resolved.extend(resp)
+        return tuple(resolved)
+
+    async def load_prefix_index(self, key: int, message: dico.Message) -> typing.Tuple[typing.Tuple[str, ...], PrefixIndex]:
+        resolved = await self.resolve_dynamic_prefixes(message)
+        stale = self.prefix_cache.get(key, ignore_expiration=True)
+        if stale is not None and stale[0] == resolved:
+            return stale
+        return resolved, PrefixIndex((*self.__static_prefix_index.prefixes, *resolved))
+
+    def invalidate_prefix(self, guild_id: typing.Optional[dico.Snowflake.TYPING] = None):
+        if guild_id is None:
+            self.prefix_cache.clear()
+        else:
+            self.prefix_cache.remove(int(guild_id))
 
     async def verify_prefix(self, message: dico.Message):
-        # final_prefixes = [(await x(message)) if is_coro(x) else x(message) if inspect.isfunction(x) else x for x in self.prefixes]
-        final_prefixes = []
-        for x in self.prefixes:
-            if is_coro(x):
-                resp = await x(message)
-                if isinstance(resp, str):
-                    final_prefixes.append(resp)
-                else:
-                    final_prefixes.extend(resp)
-            elif inspect.isfunction(x):
-                resp = x(message)
-                if isinstance(resp, str):
-                    final_prefixes.append(resp)
+        index = self.__static_prefix_index
+        if self.__dynamic_prefixes:
+            key = int(message.guild_id or message.channel_id)
+            _, index = await self.prefix_cache.get_or_load(key, lambda: self.load_prefix_index(key, message))
+        return index.match(message.content)
+
+    def prefilter_message(self, message: dico.Message) -> bool:
+        stats = self.message_stats
+        stats["received"] += 1
+        if message.author.bot:
+            stats["bot"] += 1
+            return False
+        cont = message.content
+        if not cont:
+            stats["empty"] += 1
+            return False
+        if (self.allowed_guild_ids is not None and (not message.guild_id or int(message.guild_id) not in self.allowed_guild_ids)) \
+                or (self.allowed_channel_ids is not None and int(message.channel_id) not in self.allowed_channel_ids):
+            stats["allowlist"] += 1
+            return False
+        index = self.__static_prefix_index
+        if self.__dynamic_prefixes:
+            # Dynamic prefixes can only be checked here while the guild's resolved index is still fresh.
+            cached = self.prefix_cache.get(int(message.guild_id or message.channel_id))
+            index = cached[1] if cached is not None else None
+        if index is not None and not index.can_match(cont):
+            stats["first_char"] += 1
+            return False
+        stats["passed"] += 1
+        return True
+
+    async def handle_message_create(self, message: dico.Message):
+        if self.converter_indexes:
+            self.converter_indexes.add_message(message)
+        if not self.__draining and self.prefilter_message(message):
+            await self.execute_handler(message)
+
+    async def process_messages(self, messages: typing.Iterable[dico.Message], *, concurrency: int = 50) -> int:
+        messages = [*messages]
+        if self.converter_indexes:
+            for x in messages:
+                self.converter_indexes.add_message(x)
+        if self.__draining:
+            return 0
+        messages = [x for x in messages if self.prefilter_message(x)]
+        if not messages:
+            return 0
+        indexes: typing.Dict[int, PrefixIndex] = {}
+        if self.__dynamic_prefixes:
+            first = {}
+            for x in messages:
+                first.setdefault(int(x.guild_id or x.channel_id), x)
+            resolved = await asyncio.gather(*[self.prefix_cache.get_or_load(k, functools.partial(self.load_prefix_index, k, v)) for k, v in first.items()], return_exceptions=True)
+            for k, v in zip(first, resolved):
+                if isinstance(v, BaseException):
+                    self.logger.error(f"Error while resolving prefixes of {k}:\n"+''.join(traceback.format_exception(type(v), v, v.__traceback__)))
                 else:
-                    final_prefixes.extend(resp)  # noqa
-            else:
-                final_prefixes.append(x)
-        prefix_result = [*map(lambda n: message.content.startswith(n), final_prefixes)]
-        if len(set(prefix_result)) != 2 and False in prefix_result:
-            return
-        for i, r in enumerate(prefix_result):
-            if r is True:
-                return final_prefixes[i]
+                    indexes[k] = v[1]
+            messages = [x for x in messages if int(x.guild_id or x.channel_id) in indexes]
+        pending = iter(messages)
+
+        async def worker():
+            for message in pending:
+                index = indexes.get(int(message.guild_id or message.channel_id)) if indexes else self.__static_prefix_index
+                await self.execute_handler(message, index)
+
+        await asyncio.gather(*[worker() for _ in range(min(concurrency, len(messages)))])
+        return len(messages)
 
-    async def execute_handler(self, message: dico.Message):
+    async def execute_handler(self, message: dico.Message, prefix_index: typing.Optional[PrefixIndex] = None):
         if message.author.bot:
             return
         cont = message.content
         if not cont:
             return
-        prefix_result = await self.verify_prefix(message)
+        metrics = self.metrics
+        start = time.perf_counter() if metrics is not None else 0.0
+        prefix_result = prefix_index.match(cont) if prefix_index is not None else await self.verify_prefix(message)
+        if metrics is not None:
+            metrics.observe("prefix", "", time.perf_counter() - start)
         if prefix_result is None:
+            self.message_stats["prefix"] += 1
             return
         raw_ipt = cont[len(prefix_result):]
         if not raw_ipt:
@@ -97,32 +366,91 @@ class Bot(dico.Client):
         if not ipt:
             return
         name = ipt[0]
-        cmd = self.commands.get(self.aliases.get(name, name))
+        cmd = None
+        if self.command_provider is not None and message.guild_id:
+            try:
+                cmd = (await self.get_guild_commands(message.guild_id)).get(name)
+            except Exception as ex:
+                self.logger.error(f"Error while loading commands of guild {message.guild_id}:\n"+''.join(traceback.format_exception(type(ex), ex, ex.__traceback__)))
+        if cmd is None:
+            cmd = self.commands.get(name)
+        if not cmd and self.__lazy_commands:
+            cmd = self.load_lazy_command(name)
         if not cmd:
+            self.message_stats["command"] += 1
+            if self.suggestion_index is not None and self.events.get("COMMAND_NOT_FOUND"):
+                self.dispatch("command_not_found", message, name, self.suggestion_index.suggest(name))
             return
+        if metrics is not None:
+            start = time.perf_counter()
+        cmd, rest = cmd.route(ipt[1] if len(ipt) > 1 else "")
         context = Context.from_message(message, prefix_result, cmd, name)
+        if cmd.parent is not None:
+            context.subcommand_name = cmd.name
+        if metrics is not None:
+            label = cmd.qualified_name
+            metrics.increment("calls", label)
+            metrics.gauge("in_flight", label, 1)
         try:
+            for x in cmd.lineage:
+                await x.update_cooldown(context)
             try:
-                args, kwargs = smart_split(ipt[1] if len(ipt) > 1 else "", cmd.args_data, subcommand=bool(cmd.subcommands))
-                if not cmd.subcommands:
-                    args, kwargs = await self.convert_args(context, cmd.args_data, args, kwargs)
+                args, kwargs = cmd.parse_plan.split(rest, subcommand=bool(cmd.subcommands))
             except Exception as ex:
                 raise InvalidArgument from ex
-            self.logger.debug(f"Command {name} executed.")
-            await cmd.invoke(context, *args, **kwargs)
+            if cmd.subcommands and (args or kwargs) and not cmd.parameters:
+                raise InvalidArgument("unknown subcommand or invalid argument passed.")
+            if metrics is not None:
+                metrics.observe("tokenize", label, time.perf_counter() - start)
+                start = time.perf_counter()
+            try:
+                args, kwargs = await self.convert_args(context, cmd, args, kwargs)
+            except Exception as ex:
+                raise InvalidArgument from ex
+            if metrics is not None:
+                metrics.observe("convert", label, time.perf_counter() - start)
+            self.logger.debug(f"Command {cmd.qualified_name} executed.")
+            await self.__supervise(context, cmd.invoke(context, *args, **kwargs))
         except Exception as ex:
+            if metrics is None:
+                return await self.handle_command_error(context, ex)
+            metrics.increment("errors", label)
+            start = time.perf_counter()
             await self.handle_command_error(context, ex)
+            metrics.observe("error", label, time.perf_counter() - start)
+        finally:
+            if metrics is not None:
+                metrics.gauge("in_flight", label, -1)
 
     def get_converter(self, convert_type: typing.Any):
         if convert_type in [str, int, float, bool]:
             return convert_type
         elif convert_type == dico.Snowflake:
             return dico.Snowflake.ensure_snowflake
+        elif not inspect.isclass(convert_type):
+            return convert_type if callable(convert_type) else None
         elif issubclass(convert_type, ConverterBase):
             return convert_type(self)
         elif convert_type in AVAILABLE_CONVERTERS:
             return AVAILABLE_CONVERTERS[convert_type](self)
 
+    def build_converter_chain(self, convert_type: typing.Any) -> ConverterChain:
+        origin = getattr(convert_type, "__origin__", None)
+        if origin is typing.Union:
+            return ConverterChain(x for t in convert_type.__args__ if t is not type(None) for x in self.build_converter_chain(t))
+        elif Literal is not None and origin is Literal:
+            return ConverterChain([(LiteralConverter(convert_type.__args__), False)])
+        elif convert_type is list or origin is list:
+            item_type = (getattr(convert_type, "__args__", None) or [None])[0]
+            inner = self.build_converter_chain(item_type) if item_type is not None and not isinstance(item_type, typing.TypeVar) else None
+            return ConverterChain([(ListConverter(inner), True)])
+        converter = self.get_converter(convert_type)
+        if converter is None:
+            return ConverterChain()
+        elif isinstance(converter, ConverterBase):
+            return ConverterChain([(converter, True)])
+        return ConverterChain([(lambda ctx, value: converter(value), is_coro(converter))])
+
     @staticmethod
     async def convert(context, value, *converters, safe: bool = False) -> typing.Optional[typing.Any]:
         orig = value
@@ -139,68 +467,117 @@ class Bot(dico.Client):
             raise ConversionFailed(value=orig)
         return value
 
-    async def convert_args(self, context: Context, args_data: dict, args: typing.List[str], kwargs: typing.Dict[str, str]) \
+    async def convert_args(self, context: Context, command: Command, args: typing.List[str], kwargs: typing.Dict[str, str]) \
             -> typing.Tuple[typing.List[typing.Any], typing.Dict[str, typing.Any]]:
-        for i, x in enumerate(args.copy()):
-            convert_type = [*args_data.values()][i]["annotation"]
-            if not convert_type:
-                continue
-            converters = []
-            if hasattr(convert_type, "__origin__") and convert_type.__origin__ is typing.Union:
-                for t in convert_type.__args__:
-                    if t is not None:
-                        converters.append(self.get_converter(t))
-            else:
-                converters.append(self.get_converter(convert_type))
-            resp = await self.convert(context, x, *[x for x in converters if x])
-            args[i] = resp
+        if command.converters is None:
+            command.resolve_converters(self)
+        chains = command.positional_converters
+        if not command.async_conversions or self.conversion_concurrency < 2:
+            for i, x in enumerate(args):
+                chain = chains[i] if i < len(chains) else chains[-1] if command.parse_plan.var_positional_in else None
+                if chain is not None:
+                    args[i] = await chain.convert(context, x)
+            for k, v in kwargs.items():
+                chain = command.converters.get(k)
+                if chain is not None and v is not None:
+                    kwargs[k] = await chain.convert(context, v)
+            return args, kwargs
+        jobs = []
+        for i, x in enumerate(args):
+            chain = chains[i] if i < len(chains) else chains[-1] if command.parse_plan.var_positional_in else None
+            if chain is not None:
+                jobs.append((args, i, chain, x))
         for k, v in kwargs.items():
-            convert_type = args_data[k]["annotation"]
-            if not convert_type:
-                continue
-            converters = []
-            if hasattr(convert_type, "__origin__") and convert_type.__origin__ is typing.Union:
-                for t in convert_type.__args__:
-                    if t is not None:
-                        converters.append(self.get_converter(t))
-            else:
-                converters.append(self.get_converter(convert_type))
-            resp = await self.convert(context, v, *[x for x in converters if x])
-            kwargs[k] = resp
+            chain = command.converters.get(k)
+            if chain is not None and v is not None:
+                jobs.append((kwargs, k, chain, v))
+        async_jobs = [i for i, x in enumerate(jobs) if x[2].is_async]
+        if len(async_jobs) < 2 or self.conversion_concurrency < 2:
+            for target, key, chain, value in jobs:
+                target[key] = await chain.convert(context, value)
+            return args, kwargs
+        semaphore = asyncio.Semaphore(self.conversion_concurrency)
+
+        async def convert(chain: ConverterChain, value: str):
+            async with semaphore:
+                return await chain.convert(context, value)
+
+        tasks = {i: self.loop.create_task(convert(jobs[i][2], jobs[i][3])) for i in async_jobs}
+        try:
+            # Awaiting in argument order keeps the reported failure deterministic.
+            for i, (target, key, chain, value) in enumerate(jobs):
+                target[key] = await (tasks[i] if i in tasks else chain.convert(context, value))
+        finally:
+            for x in tasks.values():
+                if not x.done():
+                    x.cancel()
+                elif not x.cancelled():
+                    x.exception()
         return args, kwargs
 
+    async def load_guild_commands(self, guild_id: int) -> typing.Dict[str, Command]:
+        resp = self.command_provider(guild_id)
+        if inspect.isawaitable(resp):
+            resp = await resp
+        table = {}
+        for command in resp or ():
+            for x in (command.name, *command.aliases):
+                if x in table:
+                    raise CommandAlreadyExists(name=x)
+            command.resolve_converters(self)
+            table.update(dict.fromkeys((command.name, *command.aliases), command))
+        return table
+
+    async def get_guild_commands(self, guild_id: dico.Snowflake.TYPING) -> typing.Dict[str, Command]:
+        guild_id = int(guild_id)
+        return await self.guild_commands.get_or_load(guild_id, lambda: self.load_guild_commands(guild_id))
+
+    def invalidate_guild_commands(self, *guild_ids: dico.Snowflake.TYPING):
+        if not guild_ids:
+            self.guild_commands.clear()
+        for x in guild_ids:
+            self.guild_commands.remove(int(x))
+
+    @property
+    def aliases(self) -> typing.Dict[str, str]:
+        return {k: v.name for k, v in self.commands.items() if k != v.name}
+
     def add_command(self, command: Command):
-        if command.name in self.commands:
-            raise CommandAlreadyExists(name=command.name)
-        self.commands[command.name] = command
-        for x in command.aliases:
-            if x in self.aliases:
+        for x in (command.name, *command.aliases):
+            if x in self.commands:
                 raise CommandAlreadyExists(name=x)
-            self.aliases[x] = command.name
+        command.resolve_converters(self)
+        self.commands.update(dict.fromkeys((command.name, *command.aliases), command))
+        if self.suggestion_index is not None:
+            for x in (command.name, *command.aliases):
+                self.suggestion_index.add(x)
         return command
 
     def remove_command(self, name: str):
-        if name not in self.commands:
+        command = self.commands.get(name)
+        if command is None or command.name != name:
             return
-        command = self.commands.pop(name)
-        for x in command.aliases:
-            if x in self.aliases:
-                del self.aliases[x]
+        for x in (name, *command.aliases):
+            if self.commands.get(x) is command:
+                del self.commands[x]
+                if self.suggestion_index is not None:
+                    self.suggestion_index.remove(x)
 
-    def command(self, name: typing.Optional[str] = None, *, aliases: typing.Optional[typing.List[str]] = None):
+    def command(self, name: typing.Optional[str] = None, *, aliases: typing.Optional[typing.List[str]] = None, executor: typing.Optional[str] = None):
         def wrap(func):
-            cmd = Command(func, name or func.__name__, aliases=aliases)
+            cmd = Command(func, name or func.__name__, aliases=aliases, executor=executor)
             self.add_command(cmd)
             return cmd
         return wrap
 
     async def handle_command_error(self, context, ex):
-        if await context.command.execute_error_handler(context, ex):
-            return
+        for x in reversed(context.command.lineage):
+            if await x.execute_error_handler(context, ex):
+                return
         if context.command.addon and await context.command.addon.on_addon_command_error(context, ex):
             return
         if not self.events.get("COMMAND_ERROR"):
-            self.logger.error(f"Error while executing command '{context.command.name}':\n"+''.join(traceback.format_exception(type(ex), ex, ex.__traceback__)))
+            self.logger.error(f"Error while executing command '{context.command.qualified_name}':\n"+''.join(traceback.format_exception(type(ex), ex, ex.__traceback__)))
         else:
             self.dispatch("command_error", context, ex)
 
@@ -216,19 +593,22 @@ class Bot(dico.Client):
             for command in addon.commands:
                 command.register_addon(addon)
                 self.add_command(command)
-            for event in addon.listeners:
-                event.register_addon(addon)
-                self.on_(event.event, event.func)
-            if hasattr(self, "interaction"):
-                for interaction in addon.interactions:
-                    interaction.register_self_or_cls(addon)
-                    self.interaction.add_command(interaction)
-                for callback in addon.callbacks:
-                    callback.register_self_or_cls(addon)
-                    self.interaction.add_callback(callback)
-                for autocomplete in addon.autocompletes:
-                    autocomplete.register_self_or_cls(addon)
-                    self.interaction.add_autocomplete(autocomplete)
+            self.__register_addon_hooks(addon)
+
+    def __register_addon_hooks(self, addon: "Addon"):
+        for event in addon.listeners:
+            event.register_addon(addon)
+            self.on_(event.event, event.func)
+        if hasattr(self, "interaction"):
+            for interaction in addon.interactions:
+                interaction.register_self_or_cls(addon)
+                self.interaction.add_command(interaction)
+            for callback in addon.callbacks:
+                callback.register_self_or_cls(addon)
+                self.interaction.add_callback(callback)
+            for autocomplete in addon.autocompletes:
+                autocomplete.register_self_or_cls(addon)
+                self.interaction.add_autocomplete(autocomplete)
 
     def unload_addons(self, *addons: typing.Union[str, typing.Type["Addon"]]):
         for x in addons:
@@ -239,6 +619,8 @@ class Bot(dico.Client):
                     addon = self.addons.pop(i)
                     for c in addon.commands:
                         self.remove_command(c.name)
+                    if not self.__reloading:
+                        self.cancel_invocations(addon)
                     for e in addon.listeners:
                         event_name = e.event.upper().lstrip("ON_")
                         if self.events.get(event_name):
@@ -252,21 +634,68 @@ class Bot(dico.Client):
                             self.interaction.remove_autocomplete(ac)
                     addon.on_unload()
 
-    def load_module(self, import_path: str):
+    def load_module(self, import_path: str, *, lazy_commands: typing.Optional[typing.Dict[str, typing.Iterable[str]]] = None):
+        if import_path in self.modules:
+            raise ModuleAlreadyLoaded(path=import_path)
+        if lazy_commands is not None:
+            names = [y for x in lazy_commands.items() for y in (x[0], *x[1])]
+            for x in names:
+                if x in self.commands or x in self.__lazy_commands:
+                    raise CommandAlreadyExists(name=x)
+            self.__lazy_commands.update(dict.fromkeys(names, import_path))
+            if self.suggestion_index is not None:
+                for x in names:
+                    self.suggestion_index.add(x)
+            return
+        self.__drop_lazy_module(import_path)
+        start = time.perf_counter()
         try:
             module = importlib.import_module(import_path)
-            importlib.reload(module)
-            if module.__name__ in self.modules:
-                raise ModuleAlreadyLoaded(path=import_path)
-            if hasattr(module, "load"):
-                module.load(self)
-            else:
-                raise MissingLoadFunction(path=import_path)
-            self.modules.append(module.__name__)
         except ImportError:
             raise InvalidModule(path=import_path)
+        self.__load_module(import_path, module, time.perf_counter() - start)
+
+    def __load_module(self, import_path: str, module, import_time: float):
+        if module.__name__ in self.modules:
+            raise ModuleAlreadyLoaded(path=import_path)
+        if not hasattr(module, "load"):
+            raise MissingLoadFunction(path=import_path)
+        start = time.perf_counter()
+        module.load(self)
+        self.module_load_times[module.__name__] = load_time = ModuleLoadTime(import_time, time.perf_counter() - start)
+        self.modules.append(module.__name__)
+        self.logger.debug(f"Module {module.__name__} loaded. (import: {load_time.import_time*1000:.2f}ms, load: {load_time.load_time*1000:.2f}ms)")
+
+    def __drop_lazy_module(self, import_path: str) -> bool:
+        self.lazy_failures.remove(import_path)
+        names = [k for k, v in self.__lazy_commands.items() if v == import_path]
+        for x in names:
+            del self.__lazy_commands[x]
+            if self.suggestion_index is not None:
+                self.suggestion_index.remove(x)
+        return bool(names)
+
+    def load_lazy_command(self, name: str) -> typing.Optional[Command]:
+        import_path = self.__lazy_commands.get(name)
+        if import_path is None or import_path in self.lazy_failures:
+            return None
+        names = [k for k, v in self.__lazy_commands.items() if v == import_path]
+        try:
+            self.load_module(import_path)
+        except Exception as ex:
+            # Keep the reservation but back off, so spamming the command doesn't re-import a broken module on every message.
+            self.__lazy_commands.update(dict.fromkeys(names, import_path))
+            if self.suggestion_index is not None:
+                for x in names:
+                    self.suggestion_index.add(x)
+            self.lazy_failures.set(import_path, True)
+            self.logger.error(f"Error while lazily loading module '{import_path}' for command '{name}':\n"+''.join(traceback.format_exception(type(ex), ex, ex.__traceback__)))
+            return None
+        return self.commands.get(name)
 
     def unload_module(self, import_path: str):
+        if import_path not in self.modules and self.__drop_lazy_module(import_path):
+            return
         try:
             module = importlib.import_module(import_path)
             if module.__name__ in self.modules:
@@ -281,5 +710,38 @@ class Bot(dico.Client):
             raise InvalidModule(path=import_path)
 
     def reload_module(self, import_path: str):
-        self.unload_module(import_path)
-        self.load_module(import_path)
+        if import_path not in self.modules:
+            self.unload_module(import_path)
+            return self.load_module(import_path)
+        module = importlib.import_module(import_path)
+        namespace = dict(vars(module))
+        commands = self.commands
+        addons, addon_names = [*self.addons], [*self.addon_names]
+        # Unload and load run against a copy, so the live table stays intact until the new version is in.
+        self.commands = dict(commands)
+        self.__reloading = True
+        try:
+            self.unload_module(import_path)
+            start = time.perf_counter()
+            try:
+                importlib.reload(module)
+            except ImportError:
+                raise InvalidModule(path=import_path)
+            self.__load_module(import_path, module, time.perf_counter() - start)
+        except Exception:
+            self.unload_addons(*[x.name for x in self.addons if x not in addons])
+            removed = [x for x in addons if x not in self.addons]
+            vars(module).clear()
+            vars(module).update(namespace)
+            self.commands = commands
+            if self.suggestion_index is not None:
+                self.suggestion_index.rebuild([*self.commands, *self.__lazy_commands])
+            self.addons, self.addon_names = addons, addon_names
+            for x in removed:
+                self.__register_addon_hooks(x)
+                x.on_load()
+            if import_path not in self.modules:
+                self.modules.append(import_path)
+            raise
+        finally:
+            self.__reloading = False
@@ -0,0 +1,65 @@
+import time
+import typing
+import asyncio
+from collections import OrderedDict
+
+K = typing.TypeVar("K")
+V = typing.TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(typing.Generic[K, V]):
+    def __init__(self, ttl: typing.Optional[float] = None, max_size: int = 0):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.__storage: "OrderedDict[K, typing.Tuple[typing.Optional[float], V]]" = OrderedDict()
+        self.__pending: typing.Dict[K, asyncio.Task] = {}
+
+    def __len__(self):
+        return len(self.__storage)
+
+    def __contains__(self, key: K):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key: K, default: typing.Any = None, *, ignore_expiration: bool = False) -> typing.Optional[V]:
+        entry = self.__storage.get(key)
+        if entry is None:
+            return default
+        expire_at, value = entry
+        if not ignore_expiration and expire_at is not None and expire_at <= time.monotonic():
+            return default
+        self.__storage.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V, ttl: typing.Optional[float] = _MISSING):
+        ttl = self.ttl if ttl is _MISSING else ttl
+        self.__storage[key] = (time.monotonic() + ttl if ttl is not None else None, value)
+        self.__storage.move_to_end(key)
+        while 0 < self.max_size < len(self.__storage):
+            self.__storage.popitem(last=False)
+
+    def remove(self, key: K):
+        self.__storage.pop(key, None)
+
+    def clear(self):
+        self.__storage.clear()
+
+    async def get_or_load(self, key: K, loader: typing.Callable[[], typing.Awaitable[V]], ttl: typing.Optional[float] = _MISSING) -> V:
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        task = self.__pending.get(key)
+        if task is None:
+            # The load runs in its own task so that a cancelled caller does not cancel it for everyone else waiting on the key.
+            task = self.__pending[key] = asyncio.ensure_future(self.__load(key, loader, ttl))
+            task.add_done_callback(lambda x: x.cancelled() or x.exception())  # Mark as retrieved in case no one is waiting.
+        return await asyncio.shield(task)
+
+    async def __load(self, key: K, loader: typing.Callable[[], typing.Awaitable[V]], ttl: typing.Optional[float]) -> V:
+        try:
+            value = await loader()
+            self.set(key, value, ttl)
+            return value
+        finally:
+            self.__pending.pop(key, None)
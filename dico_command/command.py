@@ -1,40 +1,114 @@
+import sys
+import time
+import types
 import typing
+import asyncio
+import functools
+from .concurrency import MaxConcurrency
 from .context import Context
-from .exception import CheckFailed, InvalidArgument
-from .utils import read_function, is_coro, smart_split
+from .cooldowns import Cooldown
+from .exception import CheckFailed, CommandAlreadyExists, CommandOnCooldown
+from .utils import read_parameters, is_coro, ensure_executor_type, Parameter, ParsePlan
+
+if typing.TYPE_CHECKING:
+    from .bot import Bot
+    from .converter import ConverterChain
+
+
+EMPTY_TABLE: typing.Mapping[str, "Command"] = types.MappingProxyType({})
 
 
 class Command:
+    __slots__ = ("func", "name", "executor", "checks", "aliases", "subcommands", "subcommand_table", "error_handler",
+                 "parameters", "parse_plan", "converters", "positional_converters", "async_conversions", "concurrency", "cooldown", "timeout",
+                 "addon", "parent", "is_subcommand")
+
     def __init__(self,
                  func,
                  name: str,
                  checks: typing.Optional[typing.List[typing.Callable[[Context], typing.Union[bool, typing.Awaitable[bool]]]]] = None,
                  aliases: typing.Optional[typing.List[str]] = None,
-                 is_subcommand: bool = False):
+                 is_subcommand: bool = False,
+                 executor: typing.Optional[str] = None):
         self.func = func
-        self.name = name
-        self.checks = checks or []
-        self.aliases = aliases or []
-        self.subcommands = {}
+        self.name: str = sys.intern(name or func.__name__)
+        self.executor = ensure_executor_type(executor)
+        self.checks: typing.Tuple[typing.Callable[[Context], typing.Union[bool, typing.Awaitable[bool]]], ...] = (*(checks or ()), *getattr(func, "_checks", ()))
+        self.aliases: typing.Tuple[str, ...] = tuple(sys.intern(x) for x in aliases or ())
+        self.subcommands: typing.Mapping[str, "Command"] = EMPTY_TABLE
+        self.subcommand_table: typing.Mapping[str, "Command"] = EMPTY_TABLE
         self.error_handler = None
 
-        self.args_data = read_function(self.func)
-        if hasattr(func, "_checks"):
-            self.checks.extend(func._checks)
+        self.parameters: typing.Tuple[Parameter, ...] = read_parameters(self.func)
+        self.parse_plan = ParsePlan.from_parameters(self.parameters)
+        self.converters: typing.Optional[typing.Dict[str, typing.Optional["ConverterChain"]]] = None
+        self.positional_converters: typing.Tuple[typing.Optional["ConverterChain"], ...] = ()
+        self.async_conversions: bool = False
+        self.concurrency: typing.Optional[MaxConcurrency] = getattr(func, "_max_concurrency", None)
+        self.cooldown: typing.Optional[Cooldown] = getattr(func, "_cooldown", None)
+        self.timeout: typing.Optional[float] = getattr(func, "_timeout", None)
         self.addon = None
+        self.parent: typing.Optional["Command"] = None
         self.is_subcommand = is_subcommand
 
     def subcommand(self, *args, **kwargs):
-        if self.is_subcommand:
-            raise AttributeError("unable to create subcommand in subcommand.")
-
         def wrap(coro):
             cmd = command(*args, **kwargs)(coro)
-            cmd.is_subcommand = True
-            self.subcommands[cmd.name] = cmd
+            self.add_subcommand(cmd)
             return cmd
         return wrap
 
+    def add_subcommand(self, cmd: "Command"):
+        for x in (cmd.name, *cmd.aliases):
+            if x in self.subcommand_table:
+                raise CommandAlreadyExists(name=f"{self.qualified_name} {x}")
+        cmd.is_subcommand = True
+        cmd.parent = self
+        if self.addon is not None:
+            cmd.register_addon(self.addon)
+        self.subcommands = {**self.subcommands, cmd.name: cmd}
+        self.subcommand_table = {**self.subcommand_table, **dict.fromkeys((cmd.name, *cmd.aliases), cmd)}
+        return cmd
+
+    @property
+    def args_data(self) -> typing.Dict[str, dict]:
+        return {x.name: {"required": x.required, "default": x.default, "annotation": x.annotation, "kind": x.kind} for x in self.parameters}
+
+    def route(self, ipt: str) -> typing.Tuple["Command", str]:
+        cmd = self
+        while cmd.subcommand_table and ipt:
+            split = ipt.split(maxsplit=1)
+            subcommand = cmd.subcommand_table.get(split[0])
+            if subcommand is None:
+                break
+            cmd = subcommand
+            ipt = split[1] if len(split) > 1 else ""
+        return cmd, ipt
+
+    @property
+    def lineage(self) -> typing.Tuple["Command", ...]:
+        return (*self.parent.lineage, self) if self.parent else (self,)
+
+    @property
+    def qualified_name(self) -> str:
+        return f"{self.parent.qualified_name} {self.name}" if self.parent else self.name
+
+    async def update_cooldown(self, ctx: Context):
+        if self.cooldown is None:
+            return
+        retry_after = await self.cooldown.hit(ctx, self.qualified_name, ctx.bot.cooldown_backend)
+        if retry_after:
+            raise CommandOnCooldown(retry_after=retry_after)
+
+    def resolve_converters(self, bot: "Bot"):
+        self.converters = {x.name: bot.build_converter_chain(x.annotation) if x.annotation else None for x in self.parameters}
+        self.positional_converters = tuple(self.converters[x.name] for x in self.parameters if x.kind != x.kind.KEYWORD_ONLY)
+        async_chains = [x for x in self.converters.values() if x is not None and x.is_async]
+        last = self.positional_converters[-1] if self.positional_converters else None
+        self.async_conversions = len(async_chains) > 1 or bool(self.parse_plan.var_positional_in and last is not None and last.is_async)
+        for x in self.subcommands.values():
+            x.resolve_converters(bot)
+
     def register_addon(self, addon):
         self.addon = addon
         for x in self.subcommands.values():
@@ -50,49 +124,84 @@ class Command:
         self.error_handler = coro
         return coro
 
+    async def find_failed_check(self, ctx: Context) -> typing.Optional[typing.Callable]:
+        if self.parent is not None:
+            failed = await self.parent.find_failed_check(ctx)
+            if failed is not None:
+                return failed
+        if self.addon and (self.parent is None or self.parent.addon is not self.addon) and not await self.addon.addon_check(ctx):
+            return self.addon.addon_check
+        # Sync checks are cheapest, so they run first; independent coroutine checks run concurrently at the end.
+        dependent = []
+        independent = []
+        for x in self.checks:
+            if getattr(x, "independent", False):
+                independent.append(x)
+            elif is_coro(x):
+                dependent.append(x)
+            elif not x(ctx):
+                return x
+        for x in dependent:
+            if not await x(ctx):
+                return x
+        if not independent:
+            return
+        tasks = {asyncio.ensure_future(x(ctx)): x for x in independent}
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for x in done:
+                    if not x.result():
+                        return tasks[x]
+        finally:
+            for x in tasks:
+                if not x.done():
+                    x.cancel()
+                elif not x.cancelled():
+                    x.exception()  # Mark as retrieved since only the first failure matters.
+
     async def evaluate_checks(self, ctx: Context):
-        if self.addon and not await self.addon.addon_check(ctx):
-            return False
-        resp = [n for n in [(await x(ctx)) if is_coro(x) else x(ctx) for x in self.checks] if not n]
-        return not resp
+        return await self.find_failed_check(ctx) is None
 
     async def invoke(self, ctx: Context, *args, **kwargs):
-        if not await self.evaluate_checks(ctx):
-            raise CheckFailed
-        tgt = self.func
-        args = [*args]
-        subcommand_invoking = False
-        subcommand_name = None
-        subcommand = None
-        if self.subcommands:
-            if args and args[0] in self.subcommands:
-                subcommand = self.subcommands[args[0]]
-                tgt = subcommand.invoke
-                del args[0]
-                subcommand_invoking = True
-            elif kwargs and [*kwargs.values()][0] in self.subcommands:
-                subcommand = self.subcommands[kwargs.pop([*kwargs.keys()][0])]
-                tgt = subcommand.invoke
-                subcommand_invoking = True
-            elif (args or kwargs) and not self.args_data:
-                raise InvalidArgument("unknown subcommand or invalid argument passed.")
-            else:
-                args, kwargs = await ctx.bot.convert_args(ctx, self.args_data, args, kwargs)
-        elif (args or kwargs) and not self.args_data:
-            raise InvalidArgument("invalid argument data.")
-        if subcommand_invoking:
-            ctx.subcommand_name = subcommand_name
-            msg = ctx.content[len(ctx.prefix):]
-            ipt = msg.split(maxsplit=1)
-            ipt = ipt[1].split(maxsplit=1) if len(ipt) > 1 else []
-            args, kwargs = smart_split(ipt[1] if len(ipt) > 1 else "", subcommand.args_data, subcommand=bool(subcommand.subcommands))
-            if not subcommand.subcommands:
-                args, kwargs = await ctx.bot.convert_args(ctx, subcommand.args_data, args, kwargs)
-        init_args = (ctx,) if self.addon is None or subcommand_invoking else (self.addon, ctx)
-        return await tgt(*init_args, *args, **kwargs)
-
-
-def command(name: typing.Optional[str] = None, *, aliases: typing.Optional[typing.List[str]] = None):
+        metrics = ctx.bot.metrics
+        start = time.perf_counter() if metrics is not None else 0.0
+        failed = await self.find_failed_check(ctx)
+        if metrics is not None:
+            metrics.observe("checks", self.qualified_name, time.perf_counter() - start)
+        if failed is not None:
+            raise CheckFailed(check=failed)
+        limits = [x.concurrency for x in self.lineage if x.concurrency is not None]
+        if not limits:
+            return await self.__invoke(ctx, *args, **kwargs)
+        acquired = []
+        try:
+            for x in limits:
+                acquired.append((x, await x.acquire(ctx)))
+            return await self.__invoke(ctx, *args, **kwargs)
+        finally:
+            for x, key in reversed(acquired):
+                x.release(key)
+
+    async def __invoke(self, ctx: Context, *args, **kwargs):
+        metrics = ctx.bot.metrics
+        if metrics is None:
+            return await self.__call(ctx, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return await self.__call(ctx, *args, **kwargs)
+        finally:
+            metrics.observe("callback", self.qualified_name, time.perf_counter() - start)
+
+    async def __call(self, ctx: Context, *args, **kwargs):
+        init_args = (ctx,) if self.addon is None else (self.addon, ctx)
+        if self.executor and not is_coro(self.func):
+            return await ctx.bot.run_in_executor(functools.partial(self.func, *init_args, *args, **kwargs), executor=self.executor)
+        return await self.func(*init_args, *args, **kwargs)
+
+
+def command(name: typing.Optional[str] = None, *, aliases: typing.Optional[typing.List[str]] = None, executor: typing.Optional[str] = None):
     def wrap(func):
-        return Command(func, name, aliases=aliases)
+        return Command(func, name, aliases=aliases, executor=executor)
     return wrap
@@ -0,0 +1,48 @@
+import typing
+import asyncio
+from .exception import MaxConcurrencyReached
+from .utils import get_bucket_key, BUCKET_TYPES
+
+if typing.TYPE_CHECKING:
+    from .context import Context
+
+
+class MaxConcurrency:
+    def __init__(self, number: int, per: str = "global", wait: bool = False):
+        if number < 1:
+            raise ValueError("number must be at least 1.")
+        if per not in BUCKET_TYPES:
+            raise ValueError(f"invalid bucket type: {per}")
+        self.number = number
+        self.per = per
+        self.wait = wait
+        # Each bucket holds its semaphore and the count of holders and waiters, and is dropped once that count reaches 0.
+        self.__buckets: typing.Dict[typing.Optional[int], typing.List[typing.Union[asyncio.Semaphore, int]]] = {}
+
+    def __len__(self):
+        return len(self.__buckets)
+
+    async def acquire(self, ctx: "Context") -> typing.Optional[int]:
+        key = get_bucket_key(ctx, self.per)
+        bucket = self.__buckets.get(key)
+        if bucket is None:
+            bucket = self.__buckets[key] = [asyncio.Semaphore(self.number), 0]
+        if not self.wait and bucket[0].locked():
+            raise MaxConcurrencyReached(number=self.number, per=self.per)
+        bucket[1] += 1
+        try:
+            await bucket[0].acquire()
+        except BaseException:
+            self.__leave(key, bucket)
+            raise
+        return key
+
+    def release(self, key: typing.Optional[int]):
+        bucket = self.__buckets[key]
+        bucket[0].release()
+        self.__leave(key, bucket)
+
+    def __leave(self, key, bucket):
+        bucket[1] -= 1
+        if not bucket[1]:
+            del self.__buckets[key]
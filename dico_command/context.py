@@ -4,8 +4,18 @@ from dico.model.extras import FILE_TYPE
 
 
 class Context(Message):
-    def __init__(self, client, resp, prefix, command, name_used, **kwargs):
-        super().__init__(client, resp, **kwargs)
+    """
+    Wraps the message that invoked a command instead of parsing its payload again.
+
+    .. note::
+        The constructor takes the original message, ``Context(message, prefix, command, name_used)``,
+        instead of ``(client, resp, prefix, command, name_used)``. :meth:`from_message` works as before.
+    """
+    # Message.__init__ is never called; its attributes are read from the wrapped message.
+    __slots__ = ("message", "prefix", "command", "name_used", "subcommand_name")
+
+    def __init__(self, message: Message, prefix, command, name_used):
+        self.message = message
         self.prefix = prefix
         self.command = command
         self.name_used = name_used
@@ -13,7 +23,27 @@ class Context(Message):
 
     @classmethod
     def from_message(cls, message: Message, prefix, command, name_used):
-        return cls(message.client, message.raw, prefix, command, name_used)
+        return cls(message, prefix, command, name_used)
+
+    def __getattr__(self, item):
+        if item == "message":
+            raise AttributeError(item)
+        return getattr(self.message, item)
+
+    def __int__(self) -> int:
+        return int(self.message)
+
+    def __str__(self) -> str:
+        return str(self.message)
+
+    def __eq__(self, other):
+        return self.message == other
+
+    def __ne__(self, other):
+        return self.message != other
+
+    def __hash__(self):
+        return hash(self.message)
 
     @property
     def bot(self):
@@ -2,16 +2,18 @@ import re
 
 from abc import ABC, abstractmethod
 from contextlib import suppress
-from typing import TypeVar, Sequence, Generic, Type, Optional, TYPE_CHECKING, List
+from typing import TypeVar, Sequence, Generic, Type, Optional, TYPE_CHECKING, List, Any, Callable, Iterable, Tuple, Hashable, Awaitable
 
 import dico
-from dico.exception import HTTPError
+from dico.exception import HTTPError, NotFound
 
-from .utils import search, maybe_fmt
+from .exception import ConversionFailed
+from .utils import search, maybe_fmt, tokenize
 
 if TYPE_CHECKING:
     from .bot import Bot
     from .context import Context
+    from .index import ConverterIndexes
 
 
 T = TypeVar("T")
@@ -35,6 +37,14 @@ class ConverterBase(ABC, Generic[T]):
             return [x["value"] for x in objects] if objects else []
         return []
 
+    async def request_cached(self, key: Hashable, request: Callable[[], Awaitable[Any]]) -> Optional[Any]:
+        if key in self.bot.converter_misses:
+            return None
+        try:
+            return await self.bot.converter_cache.get_or_load(key, request)
+        except NotFound:
+            self.bot.converter_misses.set(key, True)
+
     def __call__(self, *args, **kwargs):
         return self.convert(*args, **kwargs)
 
@@ -47,19 +57,22 @@ class UserConverter(ConverterBase):
     CONVERT_TYPE = dico.User
 
     async def convert(self, ctx: "Context", value: str) -> Optional[T]:
-        cached = self.dump_from_cache()
-        cached.extend([x.user if isinstance(x, dico.GuildMember) else x for x in ctx.mentions])
+        indexes = self.bot.converter_indexes
+        mentioned = [x.user if isinstance(x, dico.GuildMember) else x for x in ctx.mentions]
         maybe_mention = maybe_fmt(value)
         maybe_id = value if re.match(r"^\d+$", value) else maybe_mention
         with suppress(HTTPError):
             if maybe_id:
-                return search(cached, id=maybe_id) or await self.bot.request_user(maybe_id)
-        from_username = search(cached, username=value)
-        if from_username:
-            return from_username
-        from_fullname = search(cached, __str__=value)
-        if from_fullname:
-            return from_fullname
+                return (indexes and (indexes.users.get(maybe_id) or self.bot.get(maybe_id, "user"))) or search(mentioned, id=maybe_id) or await self.request_cached(("user", int(maybe_id)), lambda: self.bot.request_user(maybe_id))
+        if indexes:
+            from_username = self.find_indexed(indexes, value) or (indexes.sync_users(self.bot.cache) and self.find_indexed(indexes, value))
+            if from_username:
+                return from_username
+        return search(mentioned, username=value) or search(mentioned, __str__=value)
+
+    @staticmethod
+    def find_indexed(indexes: "ConverterIndexes", value: str) -> Optional[T]:
+        return indexes.users.find("username", value) or indexes.users.find("__str__", value)
 
 
 class GuildMemberConverter(ConverterBase):
@@ -70,30 +83,44 @@ class GuildMemberConverter(ConverterBase):
         self.cache_type = "member"
 
     async def convert(self, ctx: "Context", value: str) -> Optional[T]:
-        cached = self.dump_from_cache(ctx.guild_id)
-        cached.extend([x for x in ctx.mentions if isinstance(x, dico.GuildMember)])
+        members = self.bot.converter_indexes and self.bot.converter_indexes.get_members(ctx.guild_id)
+        mentioned = [x for x in ctx.mentions if isinstance(x, dico.GuildMember)]
         maybe_mention = maybe_fmt(value)
         maybe_id = value if re.match(r"^\d+$", value) else maybe_mention
         with suppress(HTTPError):
             if maybe_id:
-                return search(cached, id=maybe_id) or await self.bot.request_guild_member(ctx.guild_id, maybe_id)
-        from_name = search(cached, __str__=value)
+                return (members and members.get(maybe_id)) or self.get_cached_member(ctx, maybe_id) or search(mentioned, id=maybe_id) or await self.request_cached(("member", int(ctx.guild_id), int(maybe_id)), lambda: self.bot.request_guild_member(ctx.guild_id, maybe_id))
+        from_name = self.find_indexed(ctx, value) or search(mentioned, __str__=value)
         if from_name:
             return from_name
 
+    def find_indexed(self, ctx: "Context", value: str) -> Optional[T]:
+        indexes = self.bot.converter_indexes
+        if not indexes or not ctx.guild_id:
+            return None
+        members = indexes.get_members(ctx.guild_id)
+        found = members and members.find("__str__", value, int(ctx.guild_id))
+        if not found and indexes.sync_members(self.bot.cache, ctx.guild_id):
+            members = indexes.get_members(ctx.guild_id)
+            found = members and members.find("__str__", value, int(ctx.guild_id))
+        return found
+
+    def get_cached_member(self, ctx: "Context", member_id: str) -> Optional[T]:
+        if self.bot.has_cache and ctx.guild_id:
+            return self.bot.cache.get_guild_container(ctx.guild_id).get_storage("member").get(member_id)
+
 
 class ChannelConverter(ConverterBase):
     CONVERT_TYPE = dico.Channel
 
     async def convert(self, ctx: "Context", value: str) -> Optional[T]:
-        cached = self.dump_from_cache()
-        cached.append(ctx.channel)
+        indexes = self.bot.converter_indexes
         maybe_mention = maybe_fmt(value)
         maybe_id = value if re.match(r"^\d+$", value) else maybe_mention
         with suppress(HTTPError):
             if maybe_id:
-                return search(cached, id=maybe_id) or await self.bot.request_channel(maybe_id)
-        from_name = search(cached, name=value)
+                return (indexes and indexes.channels.get(maybe_id)) or search([ctx.channel], id=maybe_id) or await self.request_cached(("channel", int(maybe_id)), lambda: self.bot.request_channel(maybe_id))
+        from_name = (indexes and indexes.channels.find("name", value, int(ctx.guild_id) if ctx.guild_id else None)) or search([ctx.channel], name=value)
         if from_name:
             return from_name
 
@@ -102,15 +129,58 @@ class RoleConverter(ConverterBase):
     CONVERT_TYPE = dico.Role
 
     async def convert(self, ctx: "Context", value: str) -> Optional[T]:
-        cached = self.dump_from_cache()
+        indexes = self.bot.converter_indexes
         maybe_mention = maybe_fmt(value)
         maybe_id = value if re.match(r"^\d+$", value) else maybe_mention
         with suppress(HTTPError):
             if maybe_id:
-                return search(cached, id=maybe_id) or search(await self.bot.request_guild_roles(ctx.guild_id), id=maybe_id)
-        from_name = search(cached, name=value)
-        if from_name:
-            return from_name
+                return (indexes and indexes.roles.get(maybe_id)) or search(await self.request_cached(("roles", int(ctx.guild_id)), lambda: self.bot.request_guild_roles(ctx.guild_id)) or [], id=maybe_id)
+        if indexes and ctx.guild_id:
+            return indexes.roles.find("name", value, int(ctx.guild_id))
+
+
+class ConverterChain:
+    __slots__ = ("converters", "is_async")
+
+    def __init__(self, converters: Iterable[Tuple[Callable[["Context", str], Any], bool]] = ()):
+        self.converters: Tuple[Tuple[Callable[["Context", str], Any], bool], ...] = tuple(converters)
+        self.is_async: bool = any(x[1] for x in self.converters)
+
+    def __iter__(self):
+        return iter(self.converters)
+
+    async def convert(self, ctx: "Context", value: str) -> Any:
+        last_ex = None
+        for func, is_async in self.converters:
+            try:
+                resp = func(ctx, value)
+                if is_async:
+                    resp = await resp
+            except Exception as ex:
+                last_ex = ex
+                continue
+            if resp is not None:
+                return resp
+        raise ConversionFailed(value=value) from last_ex
+
+
+class LiteralConverter:
+    def __init__(self, values: Sequence[Any]):
+        self.values = {str(x): x for x in values}
+
+    def __call__(self, ctx: "Context", value: str) -> Optional[Any]:
+        return self.values.get(value)
+
+
+class ListConverter:
+    def __init__(self, chain: Optional[ConverterChain] = None):
+        self.chain = chain
+
+    async def __call__(self, ctx: "Context", value: str) -> List[Any]:
+        items = [x for x, _ in tokenize(value)]
+        if self.chain is None:
+            return items
+        return [await self.chain.convert(ctx, x) for x in items]
 
 
 AVAILABLE_CONVERTERS = {
@@ -0,0 +1,91 @@
+import time
+import typing
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from .utils import get_bucket_key, BUCKET_TYPES
+
+if typing.TYPE_CHECKING:
+    from .context import Context
+
+COOLDOWN_MODES = ("token", "window")
+
+
+class CooldownBackend(ABC):
+    @abstractmethod
+    async def hit(self, key: typing.Hashable, rate: int, per: float, mode: str) -> float:
+        """Consumes one use of ``key`` and returns seconds to wait, or 0 if the use is allowed."""
+        pass
+
+    async def reset(self, key: typing.Hashable):
+        pass
+
+
+class MemoryCooldownBackend(CooldownBackend):
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        # key -> [expire_at, a, b]; (a, b) is (tokens, last) for token bucket and (window_start, count) for fixed window.
+        self.__storage: "OrderedDict[typing.Hashable, typing.List[float]]" = OrderedDict()
+
+    def __len__(self):
+        return len(self.__storage)
+
+    async def hit(self, key: typing.Hashable, rate: int, per: float, mode: str) -> float:
+        now = time.monotonic()
+        entry = self.__storage.get(key)
+        if entry is None or entry[0] <= now:
+            entry = self.__storage[key] = [0, float(rate), now] if mode == "token" else [0, now, 0]
+        else:
+            self.__storage.move_to_end(key)
+        if mode == "token":
+            tokens = min(float(rate), entry[1] + (now - entry[2]) * rate / per)
+            entry[2] = now
+            if tokens < 1:
+                entry[1] = tokens
+                retry_after = (1 - tokens) * per / rate
+            else:
+                entry[1] = tokens - 1
+                retry_after = 0.0
+            entry[0] = now + (rate - entry[1]) * per / rate
+        else:
+            if now >= entry[1] + per:
+                entry[1], entry[2] = now, 0
+            entry[2] += 1
+            entry[0] = entry[1] + per
+            retry_after = 0.0 if entry[2] <= rate else entry[0] - now
+        self.__sweep(now)
+        return retry_after
+
+    async def reset(self, key: typing.Hashable):
+        self.__storage.pop(key, None)
+
+    def __sweep(self, now: float):
+        # Least recently used entries sit at the front, so a couple of steps per hit keep expired keys from piling up.
+        for _ in range(2):
+            if not self.__storage:
+                return
+            key, entry = next(iter(self.__storage.items()))
+            if entry[0] > now:
+                break
+            del self.__storage[key]
+        while 0 < self.max_size < len(self.__storage):
+            self.__storage.popitem(last=False)
+
+
+class Cooldown:
+    def __init__(self, rate: int, per: float, bucket: str = "user", mode: str = "token"):
+        if rate < 1 or per <= 0:
+            raise ValueError("rate must be at least 1 and per must be positive.")
+        if bucket not in BUCKET_TYPES:
+            raise ValueError(f"invalid bucket type: {bucket}")
+        if mode not in COOLDOWN_MODES:
+            raise ValueError(f"invalid cooldown mode: {mode}")
+        self.rate = rate
+        self.per = per
+        self.bucket = bucket
+        self.mode = mode
+
+    def get_key(self, ctx: "Context", name: str) -> typing.Tuple[str, typing.Optional[int]]:
+        return name, get_bucket_key(ctx, self.bucket)
+
+    async def hit(self, ctx: "Context", name: str, backend: CooldownBackend) -> float:
+        return await backend.hit(self.get_key(ctx, name), self.rate, self.per, self.mode)
@@ -1,12 +1,36 @@
 import typing
+import functools
 from .command import Command
+from .concurrency import MaxConcurrency
+from .cooldowns import Cooldown
 from .context import Context
+from .utils import is_coro, ensure_executor_type
 
 
-def checks(*funcs: typing.Callable[[Context], typing.Union[bool, typing.Awaitable[bool]]]):
+def run_check_in_executor(func: typing.Callable[[Context], bool], executor: str = "thread") -> typing.Callable[[Context], typing.Awaitable[bool]]:
+    @functools.wraps(func)
+    async def wrap(ctx: Context):
+        return await ctx.bot.run_in_executor(func, ctx, executor=executor)
+    return wrap
+
+
+def independent_check(func: typing.Callable[[Context], typing.Union[bool, typing.Awaitable[bool]]]) -> typing.Callable[[Context], typing.Awaitable[bool]]:
+    @functools.wraps(func)
+    async def wrap(ctx: Context):
+        return (await func(ctx)) if is_coro(func) else func(ctx)
+    wrap.independent = True
+    return wrap
+
+
+def checks(*funcs: typing.Callable[[Context], typing.Union[bool, typing.Awaitable[bool]]], executor: typing.Optional[str] = None, independent: bool = False):
+    if ensure_executor_type(executor):
+        funcs = tuple(x if is_coro(x) else run_check_in_executor(x, executor) for x in funcs)
+    if independent:
+        funcs = tuple(independent_check(x) for x in funcs)
+
     def wrap(maybe_cmd):
         if isinstance(maybe_cmd, Command):
-            maybe_cmd.checks.extend(funcs)
+            maybe_cmd.checks = (*maybe_cmd.checks, *funcs)
         else:
             if hasattr(maybe_cmd, "_checks"):
                 maybe_cmd._checks.extend(funcs)
@@ -16,6 +40,38 @@ def checks(*funcs: typing.Callable[[Context], typing.Union[bool, typing.Awaitabl
     return wrap
 
 
+def max_concurrency(number: int, per: str = "global", *, wait: bool = False):
+    def wrap(maybe_cmd):
+        limit = MaxConcurrency(number, per, wait)
+        if isinstance(maybe_cmd, Command):
+            maybe_cmd.concurrency = limit
+        else:
+            maybe_cmd._max_concurrency = limit
+        return maybe_cmd
+    return wrap
+
+
+def cooldown(rate: int, per: float, bucket: str = "user", *, mode: str = "token"):
+    def wrap(maybe_cmd):
+        limit = Cooldown(rate, per, bucket, mode)
+        if isinstance(maybe_cmd, Command):
+            maybe_cmd.cooldown = limit
+        else:
+            maybe_cmd._cooldown = limit
+        return maybe_cmd
+    return wrap
+
+
+def timeout(seconds: float):
+    def wrap(maybe_cmd):
+        if isinstance(maybe_cmd, Command):
+            maybe_cmd.timeout = seconds
+        else:
+            maybe_cmd._timeout = seconds
+        return maybe_cmd
+    return wrap
+
+
 async def __is_owner(ctx: Context):
     return await ctx.bot.is_owner(ctx)
 
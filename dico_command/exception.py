@@ -21,6 +21,12 @@ class InvalidArgument(CommandException):
 
 class CheckFailed(CommandException):
     """Command check has failed."""
+    def __init__(self, *args, check=None):
+        self.check = check
+        if check is not None and not args:
+            name = getattr(check, "__qualname__", None) or getattr(check, "__name__", None) or repr(check)
+            args = [f"Command check {name} has failed."]
+        super().__init__(*args)
 
 
 class InvalidModule(CommandException):
@@ -49,3 +55,18 @@ class AddonAlreadyLoaded(CommandException):
 
 class ConversionFailed(CommandException):
     """Converting {value} has failed."""
+
+
+class MaxConcurrencyReached(CommandException):
+    """Command can be run only {number} time(s) at once per {per}."""
+
+
+class CommandTimedOut(CommandException):
+    """Command has exceeded timeout of {timeout} second(s)."""
+
+
+class CommandOnCooldown(CommandException):
+    """Command is on cooldown. Retry after {retry_after:.2f} second(s)."""
+    def __init__(self, *args, **fmt):
+        self.retry_after = fmt.get("retry_after")
+        super().__init__(*args, **fmt)
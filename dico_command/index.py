@@ -0,0 +1,195 @@
+import typing
+import dico
+
+if typing.TYPE_CHECKING:
+    from dico.cache import CacheContainer
+    from .bot import Bot
+
+T = typing.TypeVar("T")
+
+
+class EntityIndex(typing.Generic[T]):
+    def __init__(self, *keys: str):
+        self.keys = keys
+        self.__objects: typing.Dict[int, T] = {}
+        self.__entries: typing.Dict[int, typing.Tuple[typing.Any, typing.Tuple[tuple, ...]]] = {}
+        self.__lookup: typing.Dict[tuple, typing.Dict[int, T]] = {}
+        self.__scopes: typing.Dict[typing.Any, typing.Dict[int, None]] = {}
+
+    def __len__(self):
+        return len(self.__objects)
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return iter(self.__objects)
+
+    def __key_values(self, obj: T) -> typing.Iterator[typing.Tuple[str, typing.Any]]:
+        for key in self.keys:
+            value = str(obj) if key == "__str__" else getattr(obj, key, None)
+            if value is not None:
+                yield key, value
+
+    def add(self, obj: T, scope: typing.Any = None):
+        obj_id = int(obj.id)
+        lookups = tuple((scope, k, v) for k, v in self.__key_values(obj))
+        if self.__entries.get(obj_id) == (scope, lookups):
+            self.__objects[obj_id] = obj
+            for x in lookups:
+                self.__lookup[x][obj_id] = obj
+            return
+        self.remove(obj_id)
+        self.__objects[obj_id] = obj
+        self.__entries[obj_id] = (scope, lookups)
+        self.__scopes.setdefault(scope, {})[obj_id] = None
+        for x in lookups:
+            self.__lookup.setdefault(x, {})[obj_id] = obj
+
+    def remove(self, obj_id: dico.Snowflake.TYPING):
+        obj_id = int(obj_id)
+        if obj_id not in self.__entries:
+            return
+        del self.__objects[obj_id]
+        scope, lookups = self.__entries.pop(obj_id)
+        self.__scopes[scope].pop(obj_id, None)
+        if not self.__scopes[scope]:
+            del self.__scopes[scope]
+        for x in lookups:
+            matches = self.__lookup[x]
+            matches.pop(obj_id, None)
+            if not matches:
+                del self.__lookup[x]
+
+    def clear(self, scope: typing.Any = None):
+        for x in [*self.__scopes.get(scope, ())]:
+            self.remove(x)
+
+    def get(self, obj_id: dico.Snowflake.TYPING) -> typing.Optional[T]:
+        return self.__objects.get(int(obj_id))
+
+    def find(self, key: str, value: typing.Any, scope: typing.Any = None) -> typing.Optional[T]:
+        matches = self.__lookup.get((scope, key, value))
+        if matches:
+            return next(iter(matches.values()))
+
+
+class ConverterIndexes:
+    def __init__(self):
+        self.users: EntityIndex[dico.User] = EntityIndex("username", "__str__")
+        self.members: typing.Dict[int, EntityIndex[dico.GuildMember]] = {}
+        self.channels: EntityIndex[dico.Channel] = EntityIndex("name")
+        self.roles: EntityIndex[dico.Role] = EntityIndex("name")
+        self.__memberships: typing.Dict[int, int] = {}
+        self.__synced_sizes: typing.Dict[typing.Any, int] = {}
+
+    def get_members(self, guild_id: dico.Snowflake.TYPING) -> typing.Optional[EntityIndex[dico.GuildMember]]:
+        return self.members.get(int(guild_id)) if guild_id else None
+
+    def register(self, bot: "Bot"):
+        bot.on("GUILD_CREATE", self.add_guild)
+        bot.on("GUILD_UPDATE", self.add_guild)
+        bot.on("GUILD_DELETE", self.remove_guild)
+        bot.on("GUILD_MEMBER_ADD", self.add_member)
+        bot.on("GUILD_MEMBER_UPDATE", lambda event: self.add_member(dico.GuildMember(bot, dict(event.raw), user=event.user, guild_id=event.guild_id)))
+        bot.on("GUILD_MEMBER_REMOVE", self.remove_member)
+        bot.on("GUILD_MEMBERS_CHUNK", lambda chunk: self.add_member_chunk(bot, chunk))
+        bot.on("CHANNEL_CREATE", self.add_channel)
+        bot.on("CHANNEL_UPDATE", self.add_channel)
+        bot.on("CHANNEL_DELETE", lambda channel: self.channels.remove(channel.id))
+        bot.on("GUILD_ROLE_CREATE", lambda event: self.roles.add(event.role, int(event.guild_id)))
+        bot.on("GUILD_ROLE_UPDATE", lambda event: self.roles.add(event.role, int(event.guild_id)))
+        bot.on("GUILD_ROLE_DELETE", lambda event: self.roles.remove(event.role_id))
+        # Update events only write themselves to the cache when collected, so the index keeps its own copies.
+        bot.on("USER_UPDATE", lambda event: self.users.add(dico.User(bot, dict(event.raw))))
+
+    def add_guild(self, guild: dico.Guild):
+        guild_id = int(guild.id)
+        for x in guild.roles or []:
+            self.roles.add(x, guild_id)
+        for x in getattr(guild, "channels", None) or []:
+            self.add_channel(x)
+        for x in getattr(guild, "members", None) or []:
+            self.add_member(x, guild_id)
+
+    def remove_guild(self, guild: typing.Optional[dico.Guild]):
+        # GUILD_DELETE carries no guild name, so dico dispatches None; Bot.dispatch removes those from the raw payload.
+        if guild is not None:
+            self.remove_guild_id(guild.id)
+
+    def remove_guild_id(self, guild_id: dico.Snowflake.TYPING):
+        guild_id = int(guild_id)
+        self.__synced_sizes.pop(("member", guild_id), None)
+        for x in self.members.pop(guild_id, ()):
+            self.__release_user(x)
+        self.channels.clear(guild_id)
+        self.roles.clear(guild_id)
+
+    def add_member(self, member: dico.GuildMember, guild_id: typing.Optional[int] = None):
+        guild_id = int(guild_id or member.guild_id)
+        members = self.members.setdefault(guild_id, EntityIndex("__str__"))
+        if member.user:
+            self.users.add(member.user)
+            if members.get(member.user.id) is None:
+                self.__memberships[int(member.user.id)] = self.__memberships.get(int(member.user.id), 0) + 1
+        members.add(member, guild_id)
+
+    def add_member_chunk(self, bot: "Bot", chunk: dict):
+        guild_id = int(chunk["guild_id"])
+        for x in chunk.get("members", []):
+            self.add_member(dico.GuildMember.create(bot, x, guild_id=guild_id), guild_id)
+
+    def remove_member(self, event):
+        members = self.get_members(event.guild_id)
+        if members and members.get(event.user.id) is not None:
+            members.remove(event.user.id)
+            self.__release_user(event.user.id)
+
+    def __release_user(self, user_id: dico.Snowflake.TYPING):
+        # Users are only kept while they share a guild with the bot.
+        user_id = int(user_id)
+        count = self.__memberships.pop(user_id, 0) - 1
+        if count > 0:
+            self.__memberships[user_id] = count
+        else:
+            self.users.remove(user_id)
+
+    def add_message(self, message: dico.Message):
+        # dico caches message authors and mentions, so converters should find them by name as well.
+        guild_id = int(message.guild_id) if message.guild_id else None
+        if message.member and guild_id:
+            self.add_member(message.member, guild_id)
+        elif message.author:
+            self.users.add(message.author)
+        for x in message.mentions or []:
+            if not isinstance(x, dico.GuildMember):
+                self.users.add(x)
+            elif guild_id:
+                self.add_member(x, guild_id)
+
+    def __sync(self, key: typing.Any, storage, add: typing.Callable[[typing.Any], None]) -> bool:
+        # Objects dico cached without an event reaching the index, e.g. ones created from REST responses, are picked up on demand.
+        if storage is None or self.__synced_sizes.get(key) == storage.size:
+            return False
+        for x in storage:
+            add(x["value"])
+        self.__synced_sizes[key] = storage.size
+        return True
+
+    def sync_users(self, cache: "CacheContainer") -> bool:
+        return self.__sync("user", cache.get_storage("user"), self.users.add)
+
+    def sync_members(self, cache: "CacheContainer", guild_id: dico.Snowflake.TYPING) -> bool:
+        guild_id = int(guild_id)
+        return self.__sync(("member", guild_id), cache.get_guild_container(guild_id).get_storage("member"), lambda x: self.add_member(x, guild_id))
+
+    def add_channel(self, channel: dico.Channel):
+        self.channels.add(channel, int(channel.guild_id) if channel.guild_id else None)
+
+    def rebuild(self, cache: "CacheContainer"):
+        for x in cache.get_storage("user"):
+            self.users.add(x["value"])
+        for x in cache.get_storage("channel"):
+            self.add_channel(x["value"])
+        for guild_id, container in cache.get_storage("guild_cache").items():
+            for x in container.get_storage("role"):
+                self.roles.add(x["value"], int(guild_id))
+            for x in container.get_storage("member"):
+                self.add_member(x["value"], int(guild_id))
@@ -0,0 +1,109 @@
+import bisect
+import typing
+from abc import ABC, abstractmethod
+
+STAGES = ("prefix", "tokenize", "convert", "checks", "callback", "error")
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: typing.Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets: typing.Tuple[float, ...] = tuple(sorted(buckets))
+        self.counts: typing.List[int] = [0] * (len(self.buckets) + 1)
+        self.sum: float = 0.0
+        self.count: int = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> typing.List[typing.Tuple[float, int]]:
+        ret = []
+        total = 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            total += count
+            ret.append((bound, total))
+        return ret
+
+    def quantile(self, q: float) -> typing.Optional[float]:
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+
+
+class MetricsExporter(ABC):
+    @abstractmethod
+    def observe(self, stage: str, command: str, seconds: float):
+        pass
+
+    @abstractmethod
+    def increment(self, name: str, command: str, value: int = 1):
+        pass
+
+    @abstractmethod
+    def gauge(self, name: str, command: str, delta: int):
+        pass
+
+
+class InMemoryExporter(MetricsExporter):
+    def __init__(self, buckets: typing.Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.histograms: typing.Dict[typing.Tuple[str, str], Histogram] = {}
+        self.counters: typing.Dict[typing.Tuple[str, str], int] = {}
+        self.gauges: typing.Dict[typing.Tuple[str, str], int] = {}
+
+    def observe(self, stage: str, command: str, seconds: float):
+        histogram = self.histograms.get((stage, command))
+        if histogram is None:
+            histogram = self.histograms[(stage, command)] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    def increment(self, name: str, command: str, value: int = 1):
+        self.counters[(name, command)] = self.counters.get((name, command), 0) + value
+
+    def gauge(self, name: str, command: str, delta: int):
+        self.gauges[(name, command)] = self.gauges.get((name, command), 0) + delta
+
+    def reset(self):
+        self.histograms.clear()
+        self.counters.clear()
+        self.gauges = {k: v for k, v in self.gauges.items() if v}
+
+    def snapshot(self) -> dict:
+        return {"histograms": {k: {"count": v.count, "sum": v.sum, "p50": v.quantile(0.5), "p99": v.quantile(0.99)} for k, v in self.histograms.items()},
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges)}
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class PrometheusExporter(InMemoryExporter):
+    def __init__(self, buckets: typing.Sequence[float] = DEFAULT_BUCKETS, namespace: str = "dico_command"):
+        super().__init__(buckets)
+        self.namespace = namespace
+
+    def render(self) -> str:
+        ns = self.namespace
+        lines = [f"# TYPE {ns}_stage_seconds histogram"]
+        for (stage, command), histogram in sorted(self.histograms.items()):
+            labels = f'stage="{escape_label(stage)}",command="{escape_label(command)}"'
+            for bound, total in histogram.cumulative():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{ns}_stage_seconds_bucket{{{labels},le="{le}"}} {total}')
+            lines.append(f"{ns}_stage_seconds_sum{{{labels}}} {histogram.sum!r}")
+            lines.append(f"{ns}_stage_seconds_count{{{labels}}} {histogram.count}")
+        for kind, values, suffix in (("counter", self.counters, "_total"), ("gauge", self.gauges, "")):
+            for name in sorted({x[0] for x in values}):
+                lines.append(f"# TYPE {ns}_{name}{suffix} {kind}")
+                for (key, command), value in sorted(values.items()):
+                    if key == name:
+                        lines.append(f'{ns}_{name}{suffix}{{command="{escape_label(command)}"}} {value}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,30 @@
+import typing
+
+
+class PrefixIndex:
+    __slots__ = ("prefixes", "__root")
+
+    def __init__(self, prefixes: typing.Iterable[str]):
+        self.prefixes: typing.Tuple[str, ...] = tuple(dict.fromkeys(x for x in prefixes if x is not None))
+        self.__root = {}
+        for x in self.prefixes:
+            node = self.__root
+            for char in x:
+                node = node.setdefault(char, {})
+            node[None] = x
+
+    def can_match(self, content: str) -> bool:
+        return None in self.__root or content[:1] in self.__root
+
+    def __bool__(self):
+        return bool(self.prefixes)
+
+    def match(self, content: str) -> typing.Optional[str]:
+        node = self.__root
+        found = node.get(None)  # An empty prefix matches every message.
+        for char in content:
+            node = node.get(char)
+            if node is None:
+                break
+            found = node.get(None, found)
+        return found
@@ -0,0 +1,77 @@
+import time
+import heapq
+import typing
+import collections
+
+
+def edit_distance(a: str, b: str) -> int:
+    # Optimal string alignment distance; adjacent transpositions count as one edit.
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        cur = [i]
+        for j, y in enumerate(b, 1):
+            cost = min(prev[j] + 1, cur[j-1] + 1, prev[j-1] + (x != y))
+            if prev2 is not None and j > 1 and x == b[j-2] and a[i-2] == y:
+                cost = min(cost, prev2[j-2] + 1)
+            cur.append(cost)
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+class SuggestionIndex:
+    def __init__(self, n: int = 2, max_results: int = 5, min_score: float = 0.3, time_budget: float = 0.005):
+        self.n = n
+        self.max_results = max_results
+        self.min_score = min_score
+        self.time_budget = time_budget
+        self.__grams: typing.Dict[str, typing.FrozenSet[str]] = {}
+        self.__postings: typing.Dict[str, typing.Set[str]] = {}
+
+    def __len__(self):
+        return len(self.__grams)
+
+    def __contains__(self, name: str):
+        return name in self.__grams
+
+    def get_grams(self, name: str) -> typing.FrozenSet[str]:
+        padded = f"{' ' * (self.n - 1)}{name.lower()} "
+        return frozenset(padded[i:i+self.n] for i in range(len(padded) - self.n + 1))
+
+    def add(self, name: str):
+        if name in self.__grams:
+            return
+        grams = self.__grams[name] = self.get_grams(name)
+        for x in grams:
+            self.__postings.setdefault(x, set()).add(name)
+
+    def remove(self, name: str):
+        for x in self.__grams.pop(name, ()):
+            names = self.__postings[x]
+            names.discard(name)
+            if not names:
+                del self.__postings[x]
+
+    def rebuild(self, names: typing.Iterable[str]):
+        self.__grams.clear()
+        self.__postings.clear()
+        for x in names:
+            self.add(x)
+
+    def suggest(self, query: str) -> typing.List[typing.Tuple[str, float]]:
+        deadline = time.perf_counter() + self.time_budget if self.time_budget is not None else None
+        shared: typing.Counter[str] = collections.Counter()
+        # Rarest grams are the most selective, so they are counted first in case the budget runs out.
+        for i, names in enumerate(sorted((self.__postings[x] for x in self.get_grams(query) if x in self.__postings), key=len)):
+            if i and deadline is not None and time.perf_counter() > deadline:
+                break
+            shared.update(names)
+        query = query.lower()
+        ret = []
+        pool = heapq.nlargest(self.max_results * 4, shared.items(), key=lambda x: (x[1], -abs(len(x[0]) - len(query))))
+        for name, _ in pool:
+            score = 1 - edit_distance(query, name.lower()) / max(len(query), len(name))
+            if score >= self.min_score:
+                ret.append((name, score))
+        ret.sort(key=lambda x: (-x[1], x[0]))
+        return ret[:self.max_results]
@@ -1,10 +1,16 @@
 import re
+import sys
 import typing
 import inspect
+import itertools
+from .cache import TTLCache
 
 
-SPLIT_PATTERN = re.compile(r'((".+")|[.\S]+)')
+SPLIT_PATTERN = re.compile(r'"((?:[^"\\]|\\.)*)"|\S+', re.S)
+ESCAPE_PATTERN = re.compile(r'\\(.)', re.S)
 FMT_REGEX = re.compile(r'^<[at]?(:[^:]*)?(@[!&]?|#|:)(\d+)(:)?.*>$')
+BUCKET_TYPES = ("global", "guild", "channel", "user")
+EXECUTOR_TYPES = ("thread", "process")
 T = typing.TypeVar("T")
 
 
@@ -12,6 +18,27 @@ def is_coro(coro):
     return inspect.iscoroutinefunction(coro) or inspect.isawaitable(coro) or inspect.iscoroutine(coro)
 
 
+def ensure_executor_type(executor: typing.Optional[str]) -> typing.Optional[str]:
+    if executor == "process":
+        raise ValueError("process executor can't receive Context, use Bot.run_in_executor for CPU-bound helpers instead.")
+    if executor is not None and executor not in EXECUTOR_TYPES:
+        raise ValueError(f"invalid executor type: {executor}")
+    return executor
+
+
+def token_value(match: typing.Match) -> str:
+    quoted = match.group(1)
+    if quoted is None:
+        return match.group(0)
+    return ESCAPE_PATTERN.sub(r"\1", quoted) if "\\" in quoted else quoted
+
+
+def tokenize(ipt: str) -> typing.Iterator[typing.Tuple[str, int]]:
+    # A quoted token that fails to close means no later token can open one, so a scan never repeats.
+    for match in SPLIT_PATTERN.finditer(ipt):
+        yield token_value(match), match.end()
+
+
 def read_function(func):
     params = [*inspect.signature(func).parameters.values()]
     if params[0].name in ["self", "cls"]:
@@ -28,58 +55,132 @@ def read_function(func):
     return ret
 
 
-def smart_split(ipt: str, args_data: dict, subcommand: bool = False) -> typing.Tuple[list, dict]:
-    if len(args_data) == 0:
-        if subcommand and ipt:
-            return [*[x[0] for x in re.findall(SPLIT_PATTERN, ipt)]], {}
-        return [], {}
-    raw_split = [x[0] for x in re.findall(SPLIT_PATTERN, ipt)]
-    initial_split = raw_split
-    args_name = [*args_data.keys()]
-    last_arg = args_data[args_name[-1]]
-    var_positional_in = True in [*map(lambda n: n["kind"] == n["kind"].VAR_POSITIONAL, args_data.values())]
-    keyword_only_count = len([x for x in args_data.values() if x["kind"] == x["kind"].KEYWORD_ONLY])
-    all_optional = bool([x for x in args_data.values() if x["required"] is False])
-    if len(args_data) == 1:
-        if last_arg["kind"] == last_arg["kind"].VAR_POSITIONAL:
-            if ipt:
-                return [ipt], {}
-            else:
-                return [], {}
-        elif last_arg["kind"] == last_arg["kind"].KEYWORD_ONLY:
-            if ipt:
-                return [], {args_name[-1]: ipt}
-            else:
-                return [], {}
-        else:
-            return [initial_split[0]] if initial_split else [], {}
-    if (len(initial_split) == len(args_data) and not keyword_only_count) or last_arg["kind"] == last_arg["kind"].VAR_POSITIONAL:  # assuming this matches
-        return initial_split, {}
-    if len(initial_split) != len(args_data) and not var_positional_in and not keyword_only_count and not all_optional:
-        raise ValueError("argument count does not match.")
-    if keyword_only_count > 1:
-        raise AttributeError("maximum keyword-only param number is 1.")
-    args = []
-    kwargs = {}
-    if not ipt.replace(" ", ""):
-        for v in args_data.values():
-            if v["required"]:
+class Parameter(typing.NamedTuple):
+    name: str
+    kind: inspect._ParameterKind  # noqa
+    required: bool
+    default: typing.Any
+    annotation: typing.Any
+
+
+# Bounded so that generated and evicted commands don't keep their annotations alive for the whole process.
+_PARAMETERS: "TTLCache[tuple, Parameter]" = TTLCache(max_size=4096)
+_PLANS: "TTLCache[tuple, ParsePlan]" = TTLCache(max_size=1024)
+
+
+def intern_parameter(param: Parameter) -> Parameter:
+    # Type and identity are part of the key so equal-but-different values like 1 and True are never merged.
+    # An entry keeps its annotation alive, so an id is never reused while its key is stored.
+    key = (param.name, param.kind, type(param.default), param.default, id(param.annotation))
+    try:
+        interned = _PARAMETERS.get(key)
+    except TypeError:
+        return param
+    if interned is None:
+        _PARAMETERS.set(key, param)
+        return param
+    return interned
+
+
+def read_parameters(func) -> typing.Tuple[Parameter, ...]:
+    return tuple(intern_parameter(Parameter(sys.intern(k), v["kind"], v["required"], v["default"], v["annotation"])) for k, v in read_function(func).items())
+
+
+class ParsePlan(typing.NamedTuple):
+    names: typing.Tuple[str, ...]
+    kinds: typing.Tuple[inspect._ParameterKind, ...]  # noqa
+    required: typing.Tuple[bool, ...]
+    var_positional_in: bool
+    keyword_only_count: int
+    has_optional: bool
+    has_required: bool
+
+    @classmethod
+    def compile(cls, args_data: dict) -> "ParsePlan":
+        kinds = tuple(x["kind"] for x in args_data.values())
+        required = tuple(x["required"] for x in args_data.values())
+        return cls(names=tuple(args_data),
+                   kinds=kinds,
+                   required=required,
+                   var_positional_in=inspect.Parameter.VAR_POSITIONAL in kinds,
+                   keyword_only_count=kinds.count(inspect.Parameter.KEYWORD_ONLY),
+                   has_optional=False in required,
+                   has_required=True in required)
+
+    @classmethod
+    def from_parameters(cls, parameters: typing.Sequence[Parameter]) -> "ParsePlan":
+        key = tuple((x.name, x.kind, x.required) for x in parameters)
+        plan = _PLANS.get(key)
+        if plan is None:
+            plan = cls.compile({x.name: x._asdict() for x in parameters})
+            _PLANS.set(key, plan)
+        return plan
+
+    @property
+    def arity(self) -> int:
+        return len(self.names)
+
+    def split(self, ipt: str, subcommand: bool = False) -> typing.Tuple[list, dict]:
+        arity = len(self.names)
+        if not arity:
+            if subcommand and ipt:
+                return [*map(token_value, SPLIT_PATTERN.finditer(ipt))], {}
+            return [], {}
+        last_kind = self.kinds[-1]
+        if arity == 1:
+            if last_kind == inspect.Parameter.VAR_POSITIONAL:
+                return [ipt] if ipt else [], {}
+            elif last_kind == inspect.Parameter.KEYWORD_ONLY:
+                return [], {self.names[0]: ipt} if ipt else {}
+            match = SPLIT_PATTERN.search(ipt)
+            return [token_value(match)] if match else [], {}
+        if last_kind == inspect.Parameter.VAR_POSITIONAL:
+            return [*map(token_value, SPLIT_PATTERN.finditer(ipt))], {}
+        # One token more than the arity is enough to tell whether the count matches.
+        tokens = [*itertools.islice(SPLIT_PATTERN.finditer(ipt), arity + 1)]
+        if len(tokens) == arity and not self.keyword_only_count:
+            return [*map(token_value, tokens)], {}
+        if len(tokens) != arity and not self.var_positional_in and not self.keyword_only_count and not self.has_optional:
+            raise ValueError("argument count does not match.")
+        if self.keyword_only_count > 1:
+            raise AttributeError("maximum keyword-only param number is 1.")
+        if ipt.count(" ") == len(ipt):
+            if self.has_required:
                 raise ValueError("empty input.")
-        return [], {}
-    for i, x in enumerate(args_data.items()):
-        k, v = x
-        if v["kind"] == v["kind"].KEYWORD_ONLY:
-            if var_positional_in:
-                raise AttributeError("unable to mix positional-only and keyword-only params.")
-            kwargs[k] = ipt or None
-            # TODO: fix kwargs is added even if it is not present
-            break
-        if i < len(initial_split):
-            args.append(initial_split[i])
-        else:
-            break
-        ipt = ipt.split(initial_split[i], 1)[-1].lstrip()
-    return args, kwargs
+            return [], {}
+        args = []
+        kwargs = {}
+        end = None
+        for i, kind in enumerate(self.kinds):
+            if kind == inspect.Parameter.KEYWORD_ONLY:
+                if self.var_positional_in:
+                    raise AttributeError("unable to mix positional-only and keyword-only params.")
+                # The rest of the input is sliced only here, once, instead of after every positional token.
+                rest = ipt[end:].lstrip() if end is not None else ipt
+                if rest or self.required[i]:
+                    kwargs[self.names[i]] = rest or None
+                break
+            if i >= len(tokens):
+                break
+            args.append(token_value(tokens[i]))
+            end = tokens[i].end()
+        return args, kwargs
+
+
+def smart_split(ipt: str, args_data: dict, subcommand: bool = False) -> typing.Tuple[list, dict]:
+    return ParsePlan.compile(args_data).split(ipt, subcommand=subcommand)
+
+
+def get_bucket_key(ctx, per: str) -> typing.Optional[int]:
+    if per == "global":
+        return None
+    elif per == "guild":
+        return int(ctx.guild_id or ctx.channel_id)
+    elif per == "channel":
+        return int(ctx.channel_id)
+    elif per == "user":
+        return int(ctx.author.id)
+    raise ValueError(f"invalid bucket type: {per}")
 
 
 def maybe_fmt(value: str) -> typing.Optional[str]:
@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+from dico_command.cache import TTLCache
+
+
+def test_cancelled_loader_caller_does_not_cancel_other_waiters():
+    async def main():
+        cache = TTLCache()
+        release = asyncio.Event()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await release.wait()
+            return "value"
+
+        first = asyncio.ensure_future(cache.get_or_load("key", loader))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(cache.get_or_load("key", loader))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await second == "value"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert cache.get("key") == "value"
+        assert len(calls) == 1
+
+    asyncio.run(main())
+
+
+def test_loader_error_reaches_every_waiter():
+    async def main():
+        cache = TTLCache()
+
+        async def loader():
+            await asyncio.sleep(0)
+            raise ValueError("failed")
+
+        results = await asyncio.gather(cache.get_or_load("key", loader), cache.get_or_load("key", loader), return_exceptions=True)
+        assert [type(x) for x in results] == [ValueError, ValueError]
+        assert "key" not in cache
+
+    asyncio.run(main())
@@ -0,0 +1,39 @@
+import asyncio
+import dico
+import dico_command
+
+
+def make_message(bot, content, author, member=None):
+    resp = {"id": "1000", "channel_id": "10", "guild_id": "1", "author": author,
+            "content": content, "timestamp": "2021-01-01T00:00:00+00:00", "edited_timestamp": None,
+            "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [],
+            "attachments": [], "embeds": [], "pinned": False, "type": 0}
+    if member is not None:
+        resp["member"] = member
+    return dico.Message(bot, resp)
+
+
+def test_user_seen_only_through_message_is_converted(monkeypatch):
+    async def request_user(self, *args):
+        raise AssertionError("converter should not reach the API")
+
+    monkeypatch.setattr(dico.Client, "_Client__request_user", lambda self: asyncio.sleep(0))
+    monkeypatch.setattr(dico.Client, "request_user", request_user)
+
+    async def main():
+        bot = dico_command.Bot("token", "!", loop=asyncio.get_running_loop())
+        out = []
+
+        @bot.command()
+        async def who(ctx, user: dico.User, member: dico.GuildMember):
+            out.append((user.username, str(member)))
+
+        alice = {"id": "77", "username": "alice", "discriminator": "0001", "avatar": None}
+        await bot.handle_message_create(make_message(bot, "hello", alice, {"roles": [], "joined_at": "2021-01-01T00:00:00+00:00"}))
+        other = {"id": "42", "username": "bob", "discriminator": "0001", "avatar": None}
+        await bot.execute_handler(make_message(bot, "!who alice alice", other))
+        await bot.execute_handler(make_message(bot, "!who 77 <@77>", other))
+        await bot.http.close()
+        return out
+
+    assert asyncio.run(main()) == [("alice", "alice"), ("alice", "alice")]